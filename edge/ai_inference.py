@@ -86,10 +86,32 @@ class SurfaceDetector:
         """Load ONNX model"""
         try:
             import onnxruntime as ort
+            import os
+            
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+            
+            # TensorRT provider with on-disk engine cache: the engine is built once, not per start
+            trt_cache = model_path.parent / 'trt_cache'
+            providers = [
+                ('TensorrtExecutionProvider', {
+                    'trt_fp16_enable': True,
+                    'trt_engine_cache_enable': True,
+                    'trt_engine_cache_path': str(trt_cache)
+                }),
+                'CUDAExecutionProvider',
+                'CPUExecutionProvider'
+            ]
+            available = set(ort.get_available_providers())
+            providers = [p for p in providers if (p[0] if isinstance(p, tuple) else p) in available]
+            if any(isinstance(p, tuple) for p in providers):
+                trt_cache.mkdir(parents=True, exist_ok=True)
             
             session = ort.InferenceSession(
                 str(model_path),
-                providers=['CUDAExecutionProvider', 'CPUExecutionProvider']
+                sess_options=options,
+                providers=providers
             )
             return session
         
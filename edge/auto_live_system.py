@@ -32,7 +32,7 @@ from collections import deque
 import statistics
 
 # GPS
-from gps_module import GPSModule
+from gps_module import GPSBackground
 
 # Geopy für Distanzberechnung
 try:
@@ -171,14 +171,14 @@ class AutoLiveSystem:
         gps_config = self.config['gps']
         
         try:
-            # GPSModule expects a config dict
+            # GPSBackground expects a config dict
             gps_module_config = {
                 'port': gps_config['port'],
                 'baudrate': gps_config['baudrate'],
                 'timeout': gps_config.get('timeout', 1.0)
             }
-            self.gps = GPSModule(gps_module_config)
-            # GPSModule starts reading automatically in constructor
+            self.gps = GPSBackground(gps_module_config)
+            # GPSBackground starts reading automatically in constructor
             
             # Wait for GPS fix
             self.logger.info("⏳ Warte auf GPS-Fix...")
@@ -9,9 +9,71 @@ import logging
 from typing import Optional, Dict, Any
 from datetime import datetime
 import time
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Sentence types carrying a position (compared on raw bytes, talker-independent)
+POSITION_SENTENCES = (b'GGA', b'RMC')
+
+
+def _parse_coordinate(value: str, hemisphere: str) -> Optional[float]:
+    """Convert NMEA (d)ddmm.mmmm + hemisphere to decimal degrees"""
+    if not value:
+        return None
+    point = value.find('.')
+    if point < 0:
+        point = len(value)
+    degrees = int(value[:point - 2])
+    minutes = float(value[point - 2:])
+    result = degrees + minutes / 60
+    if hemisphere in ('S', 'W'):
+        result = -result
+    return result
+
+
+def parse_gga(line: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a GGA sentence with plain string splitting (no pynmea2)
+    
+    Args:
+        line: NMEA sentence, e.g. "$GNGGA,...*hh"
+        
+    Returns:
+        Dictionary with latitude, longitude, altitude, satellites, fix_quality
+        (latitude/longitude are None without fix), None if the sentence is
+        not GGA or the checksum does not match
+    """
+    line = line.strip()
+    star = line.rfind('*')
+    if not line.startswith('$') or star < 0:
+        return None
+    
+    body = line[1:star]
+    checksum = 0
+    for char in body:
+        checksum ^= ord(char)
+    try:
+        if checksum != int(line[star + 1:star + 3], 16):
+            return None
+    except ValueError:
+        return None
+    
+    fields = body.split(',')
+    if len(fields) < 10 or fields[0][2:] != 'GGA':
+        return None
+    
+    try:
+        return {
+            'latitude': _parse_coordinate(fields[2], fields[3]),
+            'longitude': _parse_coordinate(fields[4], fields[5]),
+            'altitude': float(fields[9]) if fields[9] else None,
+            'satellites': int(fields[7]) if fields[7] else 0,
+            'fix_quality': int(fields[6]) if fields[6] else 0
+        }
+    except ValueError:
+        return None
+
 
 class GPSModule:
     """Interface for Ublox NEO-M8U GPS module"""
@@ -59,57 +121,15 @@ class GPSModule:
         try:
             # Read NMEA sentences until we get a valid GGA or RMC sentence
             for _ in range(10):  # Try up to 10 lines
-                line = self.serial_connection.readline().decode('ascii', errors='replace').strip()
+                line = self.serial_connection.readline()
                 
-                if not line:
+                # Skip other sentences (GSV, GSA, ...) without decoding them
+                if line[3:6] not in POSITION_SENTENCES:
                     continue
                 
-                try:
-                    msg = pynmea2.parse(line)
-                    
-                    # Parse GGA sentence (contains position and altitude)
-                    if isinstance(msg, pynmea2.types.talker.GGA):
-                        if msg.gps_qual > 0:  # Valid GPS fix
-                            # Ensure satellites is always an integer
-                            try:
-                                num_sats = int(msg.num_sats) if msg.num_sats else 0
-                            except (ValueError, TypeError):
-                                num_sats = 0
-                            
-                            # Cache satellite count for later use
-                            if num_sats > 0:
-                                self.last_satellite_count = num_sats
-                            
-                            position = {
-                                'latitude': msg.latitude,
-                                'longitude': msg.longitude,
-                                'altitude': msg.altitude if msg.altitude else 0.0,
-                                'speed': 0.0,  # GGA doesn't have speed
-                                'timestamp': datetime.utcnow().isoformat(),
-                                'satellites': num_sats,
-                                'fix_quality': msg.gps_qual
-                            }
-                            self.last_valid_position = position
-                            return position
-                    
-                    # Parse RMC sentence (contains position and speed)
-                    elif isinstance(msg, pynmea2.types.talker.RMC):
-                        if msg.status == 'A':  # Active/Valid
-                            # RMC doesn't have satellite count, use cached value
-                            position = {
-                                'latitude': msg.latitude,
-                                'longitude': msg.longitude,
-                                'altitude': 0.0,  # RMC doesn't have altitude
-                                'speed': msg.spd_over_grnd if msg.spd_over_grnd else 0.0,
-                                'timestamp': datetime.utcnow().isoformat(),
-                                'satellites': self.last_satellite_count,  # Use cached value
-                                'fix_quality': 1
-                            }
-                            self.last_valid_position = position
-                            return position
-                
-                except pynmea2.ParseError:
-                    continue
+                position = self.parse_sentence(line.decode('ascii', errors='replace').strip())
+                if position:
+                    return position
             
             logger.warning("No valid GPS fix obtained")
             return self.last_valid_position
@@ -118,6 +138,62 @@ class GPSModule:
             logger.error(f"Error reading GPS data: {e}")
             return self.last_valid_position
     
+    def parse_sentence(self, line: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse a single NMEA sentence
+        
+        Args:
+            line: Decoded NMEA sentence
+            
+        Returns:
+            Position dictionary if the sentence carries a valid fix, None otherwise
+        """
+        # Fast path for GGA sentence (contains position and altitude)
+        if line[3:6] == 'GGA':
+            fix = parse_gga(line)
+            if fix and fix['fix_quality'] > 0 and fix['latitude'] is not None:  # Valid GPS fix
+                num_sats = fix['satellites']
+                
+                # Cache satellite count for later use
+                if num_sats > 0:
+                    self.last_satellite_count = num_sats
+                
+                position = {
+                    'latitude': fix['latitude'],
+                    'longitude': fix['longitude'],
+                    'altitude': fix['altitude'] if fix['altitude'] else 0.0,
+                    'speed': 0.0,  # GGA doesn't have speed
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'satellites': num_sats,
+                    'fix_quality': fix['fix_quality']
+                }
+                self.last_valid_position = position
+                return position
+            return None
+        
+        try:
+            msg = pynmea2.parse(line)
+        except pynmea2.ParseError:
+            return None
+        
+        # Parse RMC sentence (contains position and speed)
+        if isinstance(msg, pynmea2.types.talker.RMC):
+            if msg.status == 'A':  # Active/Valid
+                # RMC doesn't have satellite count, use cached value
+                position = {
+                    'latitude': msg.latitude,
+                    'longitude': msg.longitude,
+                    'altitude': 0.0,  # RMC doesn't have altitude
+                    'speed': msg.spd_over_grnd if msg.spd_over_grnd else 0.0,
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'satellites': self.last_satellite_count,  # Use cached value
+                    'fix_quality': 1
+                }
+                self.last_valid_position = position
+                return position
+        
+        return None
+    
     def wait_for_fix(self, timeout: int = 60) -> bool:
         """
         Wait for GPS to acquire a fix
@@ -148,6 +224,96 @@ class GPSModule:
             logger.info("GPS connection closed")
 
 
+class GPSBackground:
+    """
+    GPS reader running in a background thread
+    
+    Reads NMEA sentences continuously and keeps the latest fix in memory,
+    so get_current_position() never blocks on serial IO.
+    """
+    
+    def __init__(self, config: Dict[str, Any], gps: Optional[GPSModule] = None):
+        """
+        Initialize background GPS reader
+        
+        Args:
+            config: GPS configuration dictionary containing port, baudrate, timeout
+            gps: Optional already connected GPSModule to wrap
+        """
+        self.gps = gps if gps is not None else GPSModule(config)
+        self._lock = threading.Lock()
+        self._latest = None
+        self._fix = threading.Event()  # set on the first fix
+        self._running = True
+        self._thread = threading.Thread(target=self._reader, name='gps-reader', daemon=True)
+        self._thread.start()
+    
+    def _reader(self):
+        """Read NMEA sentences and update the latest fix"""
+        while self._running:
+            ser = self.gps.serial_connection
+            if not ser:
+                time.sleep(1)
+                continue
+            
+            try:
+                line = ser.readline()
+            except Exception as e:
+                if self._running:
+                    logger.error(f"Error reading GPS data: {e}")
+                    time.sleep(1)
+                continue
+            
+            if line[3:6] not in POSITION_SENTENCES:
+                continue
+            
+            position = self.gps.parse_sentence(line.decode('ascii', errors='replace').strip())
+            if position:
+                with self._lock:
+                    self._latest = position
+                if position.get('latitude') is not None:
+                    self._fix.set()
+    
+    def get_current_position(self) -> Optional[Dict[str, Any]]:
+        """
+        Get latest GPS position without touching the serial port
+        
+        Returns:
+            Copy of the latest position dictionary, None if no fix yet
+        """
+        with self._lock:
+            return dict(self._latest) if self._latest else None
+    
+    def wait_for_fix(self, timeout: int = 60) -> bool:
+        """
+        Wait for GPS to acquire a fix
+        
+        Args:
+            timeout: Maximum time to wait in seconds
+            
+        Returns:
+            True if fix acquired, False otherwise
+        """
+        logger.info("Waiting for GPS fix...")
+        
+        # Set by the reader thread, no polling
+        if self._fix.wait(timeout):
+            position = self.get_current_position()
+            logger.info(f"GPS fix acquired: {position['latitude']:.6f}, {position['longitude']:.6f}")
+            return True
+        
+        logger.warning(f"GPS fix not acquired within {timeout} seconds")
+        return False
+    
+    def close(self):
+        """Stop reader thread and close serial connection"""
+        self._running = False
+        self.gps.close()
+        self._thread.join(timeout=2)
+    
+    stop = close
+
+
 class MockGPSModule(GPSModule):
     """Mock GPS module for testing without hardware"""
     
@@ -4,19 +4,77 @@ Prepare Web Viewer - Exportiert Inference-Daten für die Web-App
 Kopiert Bilder und GeoJSON in einen Ordner der direkt mit viewer.html genutzt werden kann
 """
 
+import os
 import sys
+import gzip
 import shutil
 import json
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def prepare_viewer_data(session_dir: str, output_dir: str = "viewer_data"):
+# Streaming-JSON-Parser (optional, hält nie das ganze GeoJSON im Speicher)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def _open_sequential(path):
+    """Öffne Datei binär mit Hinweis auf sequentielles Lesen"""
+    f = open(path, 'rb')
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    return f
+
+
+def _iter_features(path):
+    """Liefere Features einzeln (ijson) bzw. aus der komplett geladenen Datei"""
+    with _open_sequential(path) as f:
+        if ijson:
+            yield from ijson.items(f, 'features.item', use_float=True)
+        else:
+            yield from json.load(f)['features']
+
+
+def _read_metadata(f):
+    """Baue das Top-Level metadata-Objekt aus ijson-Events und höre danach auf"""
+    builder = ijson.ObjectBuilder()
+    for prefix, event, value in ijson.parse(f, use_float=True):
+        if prefix != 'metadata' and not prefix.startswith('metadata.'):
+            continue
+        builder.event(event, value)
+        if prefix == 'metadata' and event not in ('start_map', 'map_key', 'start_array'):
+            break
+    metadata = getattr(builder, 'value', None)
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def read_geojson(path):
+    """
+    Lese GeoJSON als (metadata, features)
+    
+    Mit ijson werden die Features als Generator gestreamt, die Metadaten
+    kommen aus einem eigenen Durchlauf, der nach dem metadata-Objekt abbricht
+    (steht es vor den Features, wird die Datei nur angelesen).
+    """
+    if ijson:
+        with _open_sequential(path) as f:
+            metadata = _read_metadata(f)
+        return metadata, _iter_features(path)
+    
+    with _open_sequential(path) as f:
+        geojson = json.load(f)
+    return geojson.get('metadata', {}), geojson['features']
+
+def prepare_viewer_data(session_dir: str, output_dir: str = "viewer_data", compress: bool = False):
     """
     Bereite Daten für Web-Viewer vor
     
     Args:
         session_dir: Pfad zum Inference-Session-Verzeichnis
         output_dir: Ziel-Verzeichnis für Web-Viewer
+        compress: Zusätzlich damages_grouped.geojson.gz schreiben
     """
     session_path = Path(session_dir)
     output_path = Path(output_dir)
@@ -55,22 +113,49 @@ def prepare_viewer_data(session_dir: str, output_dir: str = "viewer_data"):
         
         print(result.stdout)
     
-    # 2. Kopiere GeoJSON
-    print("📄 Kopiere GeoJSON...")
-    shutil.copy(grouped_geojson, output_path / "damages_grouped.geojson")
+    # 2. Lade GeoJSON (Features werden gestreamt)
+    metadata, features = read_geojson(grouped_geojson)
+    
+    # 3. Schreibe GeoJSON kompakt (ohne Einrückung, ~halbe Größe)
+    #    und sammle dabei alle benötigten Bilder
+    print("📄 Schreibe GeoJSON...")
+    output_geojson = output_path / "damages_grouped.geojson"
+    images_to_copy = set()
+    total_groups = 0
+    total_images = 0
+    
+    with open(output_geojson, 'w') as f:
+        f.write('{"type":"FeatureCollection","metadata":')
+        json.dump(metadata, f, separators=(',', ':'))
+        f.write(',"features":[')
+        
+        for feature in features:
+            if total_groups:
+                f.write(',')
+            json.dump(feature, f, separators=(',', ':'))
+            total_groups += 1
+            
+            for img in feature['properties'].get('images', []):
+                total_images += 1
+                filename = img.get('filename', '')
+                if filename:
+                    images_to_copy.add(filename)
+        
+        f.write(']}')
     print(f"   ✓ {grouped_geojson.name}")
     
-    # 3. Lade GeoJSON um Bild-Liste zu bekommen
-    with open(grouped_geojson) as f:
-        geojson = json.load(f)
+    output_gz = output_path / "damages_grouped.geojson.gz"
+    if compress:
+        with open(output_geojson, 'rb') as fin, \
+                gzip.open(output_gz, 'wb', compresslevel=6) as fout:
+            shutil.copyfileobj(fin, fout, length=1 << 20)
+        print(f"   ✓ {grouped_geojson.name}.gz")
+    elif output_gz.exists():
+        # viewer.html lädt die .gz bevorzugt - eine alte Version würde die neue Datei verdecken
+        output_gz.unlink()
     
-    # 4. Sammle alle benötigten Bilder
-    images_to_copy = set()
-    for feature in geojson['features']:
-        for img in feature['properties'].get('images', []):
-            filename = img.get('filename', '')
-            if filename:
-                images_to_copy.add(filename)
+    # 4. Statistik aus dem Durchlauf (keine zweite Auswertung der Datei)
+    stats = {**metadata, 'total_groups': total_groups, 'total_images': total_images}
     
     # 5. Kopiere Bilder
     print(f"\n📸 Kopiere {len(images_to_copy)} Bilder...")
@@ -83,16 +168,20 @@ def prepare_viewer_data(session_dir: str, output_dir: str = "viewer_data"):
     copied = 0
     missing = 0
     
-    for img_filename in images_to_copy:
-        src = images_source / img_filename
-        dst = images_output / img_filename
+    # Kopien direkt beim Iterieren einreichen (I/O-bound, kein Sortieren nötig)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {
+            executor.submit(shutil.copyfile, images_source / img_filename, images_output / img_filename): img_filename
+            for img_filename in images_to_copy
+        }
         
-        if src.exists():
-            shutil.copy(src, dst)
-            copied += 1
-        else:
-            print(f"   ⚠️  Bild nicht gefunden: {img_filename}")
-            missing += 1
+        for future in as_completed(futures):
+            try:
+                future.result()
+                copied += 1
+            except FileNotFoundError:
+                print(f"   ⚠️  Bild nicht gefunden: {futures[future]}")
+                missing += 1
     
     print(f"   ✓ {copied} Bilder kopiert")
     if missing > 0:
@@ -119,9 +208,9 @@ def prepare_viewer_data(session_dir: str, output_dir: str = "viewer_data"):
         f.write("3. Klicke auf Marker um Details + Bilder zu sehen\n")
         f.write("4. Nutze Pfeiltasten oder Buttons zum Durchklicken\n\n")
         f.write(f"Statistik:\n")
-        f.write(f"- Schadens-Gruppen: {geojson['metadata']['total_groups']}\n")
-        f.write(f"- Gesamt-Bilder: {geojson['metadata']['total_images']}\n")
-        f.write(f"- Gruppierungs-Distanz: {geojson['metadata']['grouping_distance_m']}m\n")
+        f.write(f"- Schadens-Gruppen: {stats['total_groups']}\n")
+        f.write(f"- Gesamt-Bilder: {stats['total_images']}\n")
+        f.write(f"- Gruppierungs-Distanz: {stats.get('grouping_distance_m', '?')}m\n")
     
     # 8. Zusammenfassung
     print(f"\n" + "="*60)
@@ -130,6 +219,8 @@ def prepare_viewer_data(session_dir: str, output_dir: str = "viewer_data"):
     print(f"Output-Verzeichnis: {output_path.absolute()}")
     print(f"\nInhalt:")
     print(f"  📄 damages_grouped.geojson")
+    if compress:
+        print(f"  📄 damages_grouped.geojson.gz")
     print(f"  📄 viewer.html")
     print(f"  📁 images/ ({copied} Dateien)")
     print(f"  📄 README.txt")
@@ -158,8 +249,13 @@ if __name__ == "__main__":
         default='viewer_data',
         help='Output-Verzeichnis (default: viewer_data)'
     )
+    parser.add_argument(
+        '--gzip',
+        action='store_true',
+        help='Zusätzlich gzip-komprimiertes GeoJSON schreiben'
+    )
     
     args = parser.parse_args()
     
-    success = prepare_viewer_data(args.session_dir, args.output)
+    success = prepare_viewer_data(args.session_dir, args.output, compress=args.gzip)
     sys.exit(0 if success else 1)
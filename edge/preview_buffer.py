@@ -0,0 +1,121 @@
+"""
+Shared-Memory Live-Vorschau für Bike Surface AI
+simple_capture.py schreibt verkleinerte Frames, web_ui.py liest sie -
+so zeigt der Stream während der Aufnahme echte Bilder, ohne die Kamera zu teilen.
+
+Layout: 32 Byte Header (seq, width, height, stride, jpeg_len) + zwei Slots
+(Double-Buffer). seq ist ein Seqlock-Zähler: ungerade = Writer schreibt gerade,
+Frame n liegt fertig in Slot n % 2 bei seq = 2n. Der Reader kopiert nur bei
+geradem seq und verwirft die Kopie, wenn der Writer inzwischen denselben Slot
+wieder angefangen hat.
+"""
+
+import struct
+
+import cv2
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+PREVIEW_NAME = 'bike_preview'
+PREVIEW_SIZE = (640, 360)  # (width, height) wie der Web-UI Stream
+HEADER = struct.Struct('<QIIII')  # seq, width, height, stride, jpeg_len (0 = Rohbild BGR)
+HEADER_SIZE = 32
+SEQ = struct.Struct('<Q')  # nur seq (Markierung "Writer schreibt")
+SLOT_SIZE = PREVIEW_SIZE[0] * PREVIEW_SIZE[1] * 3
+BUFFER_SIZE = HEADER_SIZE + 2 * SLOT_SIZE
+
+
+def _slots(shm):
+    """BGR views of both slots in the shared buffer"""
+    width, height = PREVIEW_SIZE
+    return [np.ndarray((height, width, 3), dtype=np.uint8, buffer=shm.buf,
+                       offset=HEADER_SIZE + i * SLOT_SIZE) for i in range(2)]
+
+
+def _attach(name):
+    """Attach to an existing segment without letting this process unlink it on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: resource_tracker würde das Segment beim Beenden löschen
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class PreviewReader:
+    """Owner of the preview segment (web_ui.py): creates it and reads frames"""
+
+    def __init__(self, name=PREVIEW_NAME):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=BUFFER_SIZE)
+        except FileExistsError:
+            # Übrig von einem abgestürzten Web-UI Prozess - weiterverwenden
+            self.shm = _attach(name)
+        self._slots = _slots(self.shm)
+
+    def read(self, last_seq):
+        """Return (seq, frame copy) if a frame newer than last_seq exists, else (last_seq, None)"""
+        for _ in range(3):
+            seq = SEQ.unpack_from(self.shm.buf)[0]
+            if seq & 1:
+                continue  # Writer füllt gerade einen Slot
+            if seq == 0 or seq == last_seq:
+                return last_seq, None
+            frame = self._slots[(seq >> 1) % 2].copy()
+            # seq + 1 schreibt den anderen Slot, erst ab seq + 3 wird unserer überschrieben
+            if SEQ.unpack_from(self.shm.buf)[0] - seq < 3:
+                return seq, frame
+        return last_seq, None
+
+    def close(self):
+        """Release and remove the segment"""
+        self._slots = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class PreviewWriter:
+    """Producer side (simple_capture.py): writes frames if the Web-UI is running"""
+
+    def __init__(self, name=PREVIEW_NAME):
+        self.shm = None
+        if shared_memory is None:
+            return
+        try:
+            self.shm = _attach(name)
+        except FileNotFoundError:
+            return  # Keine Web-UI -> keine Vorschau
+        if self.shm.size < BUFFER_SIZE:
+            self.shm.close()
+            self.shm = None
+            return
+        self._slots = _slots(self.shm)
+        # Gerade runden: ein abgestürzter Writer kann seq ungerade hinterlassen haben
+        self._seq = SEQ.unpack_from(self.shm.buf)[0] & ~1
+
+    def write(self, frame):
+        """Downsample frame into the inactive slot and publish it"""
+        if self.shm is None:
+            return
+        seq = self._seq + 2
+        # Erst als "wird geschrieben" markieren, dann den Slot füllen
+        SEQ.pack_into(self.shm.buf, 0, seq - 1)
+        cv2.resize(frame, PREVIEW_SIZE, dst=self._slots[(seq >> 1) % 2], interpolation=cv2.INTER_AREA)
+        HEADER.pack_into(self.shm.buf, 0, seq, PREVIEW_SIZE[0], PREVIEW_SIZE[1], PREVIEW_SIZE[0] * 3, 0)
+        self._seq = seq
+
+    def close(self):
+        """Detach without removing the segment (owned by the Web-UI)"""
+        if self.shm is not None:
+            self._slots = None
+            self.shm.close()
+            self.shm = None
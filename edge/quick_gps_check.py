@@ -1,14 +1,14 @@
 #!/usr/bin/env python3
 """Schneller GPS-Check"""
 
-from gps_module import GPSModule
+from gps_module import GPSBackground
 import time
 
 print("GPS-Check gestartet...")
 print("Lese GPS für 5 Sekunden...\n")
 
 try:
-    gps = GPSModule({'port': '/dev/ttyACM0', 'baudrate': 9600, 'timeout': 1.0})
+    gps = GPSBackground({'port': '/dev/ttyACM0', 'baudrate': 9600, 'timeout': 1.0})
     
     for i in range(5):
         fix = gps.get_current_position()
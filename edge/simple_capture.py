@@ -5,6 +5,7 @@ Stabil und ohne GUI-Konflikte
 """
 
 import cv2
+import os
 import time
 import json
 import sys
@@ -14,12 +15,30 @@ from math import radians, cos, sin, asin, sqrt
 
 # GPS Import
 try:
-    from gps_module import GPSModule
+    from gps_module import GPSBackground
     GPS_AVAILABLE = True
 except ImportError:
     GPS_AVAILABLE = False
     print("⚠ GPS-Modul nicht verfügbar")
 
+# Live-Vorschau für die Web-UI (optional)
+try:
+    from preview_buffer import PreviewWriter
+except ImportError:
+    PreviewWriter = None
+
+# Vorschau-Frames höchstens alle PREVIEW_INTERVAL Sekunden in den Shared Memory
+PREVIEW_INTERVAL = 0.1
+
+# route.geojson + metadata.json nur alle N Bilder neu schreiben (dazwischen nur points.jsonl)
+METADATA_INTERVAL = 500
+
+# Schneller JSON-Encoder (optional)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def calculate_distance(lat1, lon1, lat2, lon2):
     """Berechne Distanz zwischen zwei GPS-Punkten (Haversine)"""
@@ -110,7 +129,7 @@ def main():
     if GPS_AVAILABLE:
         print("\n🌍 Öffne GPS...")
         try:
-            gps = GPSModule(config['gps'])
+            gps = GPSBackground(config['gps'])
             print("✓ GPS verbunden")
             
             # Warte auf Fix
@@ -144,13 +163,20 @@ def main():
     print("="*60)
     print("Drücke Strg+C zum Beenden\n")
     
-    route_points = []
+    # Punkte nur fortlaufend anhängen - route.geojson/metadata.json werden daraus
+    # am Checkpoint und beim Beenden gebaut, die Liste liegt nicht im RAM
+    points_path = output_dir / "points.jsonl"
+    points_log = open(points_path, "a", buffering=1 << 16)
+    last_point = None
     image_count = 0
+    images_bytes = 0  # Summe der JPEG-Größen -> size_bytes in metadata.json
     last_capture = time.time()
     start_time = time.time()
     total_distance = 0.0
     
     capture_interval = config['collection']['capture_interval']
+    preview = PreviewWriter() if PreviewWriter else None
+    next_preview = 0.0
     image_quality = config['collection']['image_quality']
     
     try:
@@ -163,8 +189,13 @@ def main():
                 time.sleep(0.1)
                 continue
             
-            # Zeit für nächstes Bild?
+            # Verkleinerte Vorschau für den Web-UI Stream
             current_time = time.time()
+            if preview and current_time >= next_preview:
+                preview.write(frame)
+                next_preview = current_time + PREVIEW_INTERVAL
+            
+            # Zeit für nächstes Bild?
             if current_time - last_capture >= capture_interval:
                 
                 # GPS lesen (falls vorhanden). Wir speichern jetzt auch ohne GPS-Fix,
@@ -183,7 +214,7 @@ def main():
                 img_path = output_dir / "images" / img_name
                 img_path.parent.mkdir(parents=True, exist_ok=True)
 
-                cv2.imwrite(str(img_path), frame, [cv2.IMWRITE_JPEG_QUALITY, image_quality])
+                images_bytes += write_jpeg(img_path, frame, image_quality)
 
                 # GPS/Metadaten (falls vorhanden)
                 point = {
@@ -193,17 +224,16 @@ def main():
                     "longitude": gps_fix["longitude"] if gps_fix and gps_fix.get("longitude") is not None else None,
                     "altitude": gps_fix.get("altitude") if gps_fix and gps_fix.get("altitude") is not None else None
                 }
-                route_points.append(point)
+                points_log.write(json_line(point))
 
                 # Distanz berechnen nur wenn beide Punkte Koordinaten haben
-                if len(route_points) > 1 and route_points[-2]["latitude"] is not None and route_points[-1]["latitude"] is not None:
-                    p1 = route_points[-2]
-                    p2 = route_points[-1]
+                if last_point and last_point["latitude"] is not None and point["latitude"] is not None:
                     dist = calculate_distance(
-                        p1['latitude'], p1['longitude'],
-                        p2['latitude'], p2['longitude']
+                        last_point['latitude'], last_point['longitude'],
+                        point['latitude'], point['longitude']
                     )
                     total_distance += dist
+                last_point = point
 
                 image_count += 1
                 last_capture = current_time
@@ -215,9 +245,13 @@ def main():
                 else:
                     print(f"[{elapsed:04d}s] 📸 Bild {image_count:04d} | GPS: N/A | Dist: {total_distance:.1f}m")
 
-                # Zwischenspeicherung alle 10 Bilder
+                # Zwischenspeicherung: points.jsonl alle 10 Bilder, komplette Dateien
+                # nur am Checkpoint (jedes Neuschreiben kostet O(Anzahl Punkte))
                 if image_count % 10 == 0:
-                    save_route_data(output_dir, route_points, total_distance)
+                    points_log.flush()
+                if image_count % METADATA_INTERVAL == 0:
+                    points_log.flush()
+                    save_route_data(output_dir, read_points(points_path), total_distance)
             
             time.sleep(0.05)  # 20 Hz Check
             
@@ -227,12 +261,17 @@ def main():
     finally:
         # Cleanup
         print("\n📝 Speichere Daten...")
+        points_log.close()
+        route_points = read_points(points_path)
         
         if route_points:
-            save_route_data(output_dir, route_points, total_distance)
+            save_route_data(output_dir, route_points, total_distance,
+                            size_bytes=images_bytes, complete=True)
             print(f"✓ Route gespeichert: {len(route_points)} Punkte")
         
         cap.release()
+        if preview:
+            preview.close()
         if gps:
             gps.close()
         
@@ -250,8 +289,70 @@ def main():
     return 0
 
 
-def save_route_data(output_dir, route_points, total_distance):
-    """Speichere Route als GeoJSON und Metadaten"""
+def write_jpeg(path, frame, quality):
+    """
+    Speichere Frame als JPEG, gibt die geschriebenen Bytes zurück (0 bei Fehler)
+    
+    Die Page-Cache-Hinweise sorgen dafür, dass die (nie wieder gelesenen)
+    Bilddaten nicht den RAM des Jetson füllen.
+    """
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return 0
+    
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        data = memoryview(buffer).cast('B')
+        while data:
+            data = data[os.write(fd, data):]
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return buffer.nbytes
+
+
+def json_line(data):
+    """Kodiere Objekt als eine JSON-Zeile (für .jsonl-Dateien)"""
+    if orjson:
+        return orjson.dumps(data).decode() + "\n"
+    return json.dumps(data) + "\n"
+
+
+def write_json(path, data):
+    """Schreibe JSON-Datei atomar (orjson falls installiert, sonst stdlib json)"""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    if orjson:
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+    # Wird der Prozess beim Schreiben beendet, bleibt die alte Datei erhalten
+    os.replace(tmp, path)
+
+
+def read_points(path):
+    """Lese alle Punkte aus points.jsonl (eine abgeschnittene letzte Zeile wird ignoriert)"""
+    points = []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                points.append(orjson.loads(line) if orjson else json.loads(line))
+            except ValueError:
+                pass  # Absturz mitten in der Zeile
+    return points
+
+
+def save_route_data(output_dir, route_points, total_distance, size_bytes=None, complete=False):
+    """
+    Speichere Route als GeoJSON und Metadaten
+    
+    size_bytes/complete nur beim finalen Speichern - Checkpoints einer abgebrochenen
+    Session dürfen die Web-UI nicht mit Teilständen versorgen.
+    """
     
     # GeoJSON
     # Build coordinates only from points that have valid lat/lon
@@ -280,8 +381,7 @@ def save_route_data(output_dir, route_points, total_distance):
             }
         })
     
-    with open(output_dir / "route.geojson", "w") as f:
-        json.dump(geojson, f, indent=2)
+    write_json(output_dir / "route.geojson", geojson)
     
     # Metadaten
     metadata = {
@@ -289,14 +389,15 @@ def save_route_data(output_dir, route_points, total_distance):
         "session_end": datetime.now().isoformat(),
         "total_images": len(route_points),
         "distance_m": round(total_distance, 2),
+        "size_bytes": size_bytes,
+        "complete": complete,
         "camera": "Logitech C920",
         "resolution": "1920x1080",
         "gps": "Navilock 62756",
         "points": route_points
     }
     
-    with open(output_dir / "metadata.json", "w") as f:
-        json.dump(metadata, f, indent=2)
+    write_json(output_dir / "metadata.json", metadata)
 
 
 if __name__ == "__main__":
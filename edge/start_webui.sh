@@ -14,5 +14,11 @@ if ! python3 -c "import flask" 2>/dev/null; then
     pip3 install flask
 fi
 
+# Prüfe waitress (Produktions-Server, sonst Flask-Entwicklungsserver)
+if ! python3 -c "import waitress" 2>/dev/null; then
+    echo "Installiere waitress..."
+    pip3 install waitress || echo "⚠️  waitress nicht installiert - nutze Flask-Server"
+fi
+
 # Starte Server
 python3 web_ui.py
@@ -6,7 +6,7 @@ Schneller GPS-Test
 import sys
 sys.path.insert(0, '/home/kwr/bike-surface-ai/edge')
 
-from gps_module import GPSModule
+from gps_module import GPSBackground
 import time
 
 print("GPS Test...")
@@ -14,7 +14,7 @@ print("GPS Test...")
 config = {'port': '/dev/ttyACM0', 'baudrate': 9600, 'timeout': 1.0}
 
 try:
-    gps = GPSModule(config)
+    gps = GPSBackground(config)
     print("✓ GPS verbunden")
     
     print("\nLese 10 Sekunden GPS-Daten:\n")
@@ -6,10 +6,13 @@ Testet GPS (Navilock 62756) und Webcam (Logitech C920)
 
 import cv2
 import serial
-import pynmea2
+import os
+import select
 import time
 import sys
 
+from gps_module import parse_gga
+
 def test_gps():
     """Teste GPS-Empfänger"""
     print("\n=== GPS Test (Navilock 62756 u-blox NEO-M8U) ===")
@@ -21,25 +24,37 @@ def test_gps():
         start_time = time.time()
         fix_found = False
         
-        while time.time() - start_time < 30:
-            line = ser.readline().decode('ascii', errors='ignore')
+        # Gepuffert lesen: ein read() pro select() statt ein readline() pro Satz
+        buf = bytearray()
+        fd = ser.fileno()
+        
+        while time.time() - start_time < 30 and not fix_found:
+            ready, _, _ = select.select([fd], [], [], 1.0)
+            if not ready:
+                continue
+            buf += os.read(fd, 4096)
             
-            if line.startswith('$GNGGA') or line.startswith('$GPGGA'):
-                try:
-                    msg = pynmea2.parse(line)
-                    if msg.gps_qual > 0:
+            while (nl := buf.find(b'\n')) != -1:
+                line = bytes(buf[:nl])
+                del buf[:nl + 1]
+                
+                # Nur GGA-Sätze dekodieren
+                if line[:6] in (b'$GNGGA', b'$GPGGA'):
+                    fix = parse_gga(line.decode('ascii', errors='ignore'))
+                    if fix is None:
+                        continue
+                    # Fix-Qualität > 0 mit leerem Koordinatenfeld gilt noch nicht als Fix
+                    if fix['fix_quality'] > 0 and fix['latitude'] is not None and fix['longitude'] is not None:
                         print(f"✓ GPS-Fix erhalten!")
-                        print(f"  Latitude:  {msg.latitude:.6f}")
-                        print(f"  Longitude: {msg.longitude:.6f}")
-                        print(f"  Altitude:  {msg.altitude} m")
-                        print(f"  Satellites: {msg.num_sats}")
-                        print(f"  Quality:    {msg.gps_qual}")
+                        print(f"  Latitude:  {fix['latitude']:.6f}")
+                        print(f"  Longitude: {fix['longitude']:.6f}")
+                        print(f"  Altitude:  {fix['altitude']} m")
+                        print(f"  Satellites: {fix['satellites']}")
+                        print(f"  Quality:    {fix['fix_quality']}")
                         fix_found = True
                         break
                     else:
-                        print(f"  Warte auf Fix... (Satelliten: {msg.num_sats})", end='\r')
-                except pynmea2.ParseError:
-                    pass
+                        print(f"  Warte auf Fix... (Satelliten: {fix['satellites']})", end='\r')
         
         ser.close()
         
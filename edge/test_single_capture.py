@@ -3,7 +3,7 @@
 
 import cv2
 import time
-from gps_module import GPSModule
+from gps_module import GPSBackground
 from pathlib import Path
 from datetime import datetime
 
@@ -13,7 +13,7 @@ print("="*60)
 
 # GPS starten
 print("\n1️⃣ GPS verbinden...")
-gps = GPSModule({'port': '/dev/ttyACM0', 'baudrate': 9600, 'timeout': 1.0})
+gps = GPSBackground({'port': '/dev/ttyACM0', 'baudrate': 9600, 'timeout': 1.0})
 
 # Auf Fix warten
 print("2️⃣ Warte auf GPS-Fix (max 10s)...")
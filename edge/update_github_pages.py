@@ -11,6 +11,7 @@ Features:
 - Automatischer Git Commit & Push
 """
 
+import os
 import json
 import yaml
 import subprocess
@@ -18,30 +19,250 @@ from pathlib import Path
 from typing import List, Dict
 from datetime import datetime
 import shutil
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from types import MappingProxyType
 
-# Geopy für Distanzberechnung
+import numpy as np
+
+# SciPy KD-Tree für schnelle Nachbarschaftssuche (optional)
+try:
+    from scipy.spatial import cKDTree
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:
+    cKDTree = None
+
+# Schnelle JSON-(De)Serialisierung und Streaming-Parser (optional)
 try:
-    from geopy.distance import geodesic
+    import orjson
 except ImportError:
-    print("⚠️  geopy nicht installiert: pip install geopy")
-    geodesic = None
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+EARTH_RADIUS_M = 6371000.0
+
+# Puffergröße für Datei-I/O (1 MiB statt 8 KiB Standard)
+IO_BUFFER_SIZE = 1 << 20
+
+# Rangfolge für die Schwere einer Schadensgruppe
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2}
+
+# Farben je Oberfläche (unveränderlich, einmal pro Prozess)
+_SURFACE_COLORS = MappingProxyType({
+    'asphalt_excellent': '#27ae60',
+    'asphalt_good': '#2ecc71',
+    'asphalt_fair': '#f39c12',
+    'asphalt_poor': '#e74c3c',
+    'concrete': '#95a5a6',
+    'cobblestone': '#7f8c8d',
+    'paving_stones': '#8e44ad',
+    'gravel': '#d35400',
+    'dirt': '#795548'
+})
+
+# Oberfläche -> Index in _COLOR_TUPLE; unbekannte -1 -> Standardfarbe am Ende
+_CODE = MappingProxyType({name: i for i, name in enumerate(_SURFACE_COLORS)})
+_COLOR_TUPLE = tuple(_SURFACE_COLORS.values()) + ('#3498db',)
+_COLOR_ARRAY = np.array(_COLOR_TUPLE, dtype=object)
+
+# C-beschleunigter YAML-Loader, falls libyaml vorhanden
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _json_default(obj):
+    """Serialize NumPy values for stdlib json (orjson handles them natively)"""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+@lru_cache(maxsize=8)
+def _load_config(path, mtime_ns):
+    """Parse a YAML config; cached per path and mtime (treat the result as read-only)"""
+    with open(path) as f:
+        return yaml.load(f, Loader=_YAML_LOADER)
+
+
+def load_json(path):
+    """Load a JSON file"""
+    with open(path, 'rb', buffering=IO_BUFFER_SIZE) as f:
+        data = f.read()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def dumps_json(data, pretty=False):
+    """Encode data as UTF-8 JSON bytes, compact unless pretty (NumPy arrays are serialized as lists)"""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if pretty else 0))
+    if pretty:
+        return json.dumps(data, indent=2, default=_json_default).encode('utf-8')
+    return json.dumps(data, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+
+def write_json(path, data, pretty=False):
+    """Write a JSON file, compact unless pretty"""
+    with open(path, 'wb', buffering=IO_BUFFER_SIZE) as f:
+        f.write(dumps_json(data, pretty))
+
+
+def write_geojsonl(path, metadata, features):
+    """Write GeoJSONSeq: a FeatureCollection header line with metadata, then one feature per line"""
+    # Großer Puffer: viele kleine Zeilen, wenige write()-Syscalls
+    with open(path, 'wb', buffering=IO_BUFFER_SIZE) as f:
+        f.write(dumps_json({'type': 'FeatureCollection', 'metadata': metadata}))
+        f.write(b'\n')
+        for feature in features:
+            f.write(dumps_json(feature))
+            f.write(b'\n')
+
+
+def load_metadata(path):
+    """Load only the top-level 'metadata' object of a GeoJSON or GeoJSONSeq file"""
+    if path.suffix == '.geojsonl':
+        # Header-Zeile enthält die Metadaten
+        with open(path, 'rb') as f:
+            return json.loads(f.readline()).get('metadata', {})
+    if ijson:
+        with open(path, 'rb', buffering=IO_BUFFER_SIZE) as f:
+            for metadata in ijson.items(f, 'metadata', use_float=True):
+                return metadata
+        return {}
+    return load_json(path).get('metadata', {})
+
+
+def _lon_lat_alt(point):
+    """[lon, lat, alt] of a GeoJSON position, alt NaN if the position is 2D"""
+    return point[0], point[1], point[2] if len(point) > 2 else np.nan
+
+
+def _first_feature_positions(f):
+    """Yield the positions of the first feature's geometry from a GeoJSON stream (like features[0])"""
+    position = []
+    for prefix, event, value in ijson.parse(f, use_float=True):
+        if prefix == 'features.item.geometry.coordinates.item.item':
+            position.append(value)
+        elif prefix == 'features.item.geometry.coordinates.item' and event == 'end_array':
+            yield position
+            position = []
+        elif prefix == 'features.item' and event == 'end_map':
+            return  # Weitere Features (z.B. Punkte) gehören nicht zur Route
+
+
+def load_route_coordinates(path):
+    """
+    Load the route's coordinates as an (N, 3) [lon, lat, alt] float array
+    
+    Falls back to (N, 2) [lon, lat] if any position has no altitude.
+    """
+    if ijson:
+        # Streamt nur die Koordinaten, ohne Liste aus Positions-Listen aufzubauen
+        with open(path, 'rb', buffering=IO_BUFFER_SIZE) as f:
+            values = (v for point in _first_feature_positions(f) for v in _lon_lat_alt(point))
+            coords = np.fromiter(values, dtype=np.float64).reshape(-1, 3)
+    else:
+        coordinates = load_json(path)['features'][0]['geometry']['coordinates']
+        coords = np.asarray([_lon_lat_alt(c) for c in coordinates], dtype=np.float64).reshape(-1, 3)
+    if np.isnan(coords[:, 2]).any():
+        return coords[:, :2]
+    return coords
+
+
+def to_local_meters(lats, lons):
+    """Project lat/lon (degrees) onto a local tangent plane around their mean, in meters"""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    lat0 = lat.mean()
+    lon0 = lon.mean()
+    x = EARTH_RADIUS_M * np.cos(lat0) * (lon - lon0)
+    y = EARTH_RADIUS_M * (lat - lat0)
+    return np.column_stack((x, y))
+
+
+def first_within(xy, start, point, radius_m, chunk=1024):
+    """Index of the first point of xy (meters) at or after start within radius_m of point, or None"""
+    # Quadrierte Abstände vergleichen - kein sqrt pro Punkt
+    r2 = radius_m * radius_m
+    for lo in range(start, len(xy), chunk):
+        d = xy[lo:lo + chunk] - point
+        near = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1] < r2
+        if near.any():
+            return lo + int(np.argmax(near))
+    return None
+
+
+def union_find_labels(n, pairs):
+    """Connected-component label per node for an (M, 2) array of index pairs"""
+    parent = list(range(n))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    for i, j in pairs.tolist():
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    
+    return np.array([find(i) for i in range(n)], dtype=np.intp)
 
 
 class GitHubPagesUpdater:
     """GitHub Pages Updater"""
     
-    def __init__(self, config_path="config_auto_live.yaml"):
-        with open(config_path) as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, config_path="config_auto_live.yaml", now=None):
+        config_path = Path(config_path)
+        self.config = _load_config(config_path, config_path.stat().st_mtime_ns)
         
         self.gh_config = self.config['github']
         self.repo_path = Path(self.gh_config['repo_path'])
         self.data_dir = self.repo_path / self.gh_config['geojson']['output_dir']
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        # Eingerücktes JSON nur zum Debuggen - kompakt halbiert die Dateigröße
+        self.pretty = self.gh_config['geojson'].get('pretty', False)
+        # GeoJSONSeq (.geojsonl): eine Zeile pro Feature statt einer großen FeatureCollection
+        self.streaming = self.gh_config['geojson'].get('streaming', False)
         
         self.images_dir = self.repo_path / "docs" / "images"
         self.images_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Ein Zeitstempel pro Lauf für alle erzeugten Dateien (Batch-Worker erben den des Elternprozesses)
+        self._now = now or datetime.now()
+        self._now_iso = self._now.isoformat()
+        
+        # Git state: files written since the last commit, queued commit messages
+        self._dirty_paths = set()
+        self._pending_messages = []
+        # Autor für commit-tree über die Umgebung statt git config
+        user = self.gh_config.get('git_user', 'Bike Surface AI')
+        email = self.gh_config.get('git_email', 'bike-ai@example.com')
+        self._git_env = {**os.environ,
+                         'GIT_AUTHOR_NAME': user, 'GIT_AUTHOR_EMAIL': email,
+                         'GIT_COMMITTER_NAME': user, 'GIT_COMMITTER_EMAIL': email}
+        self._push_proc = None
+        
+        # Interne Caches nicht unter docs/ - sonst werden sie committet und veröffentlicht.
+        # --git-path statt .git/: in Worktrees und Submodulen ist .git eine Datei
+        cache_dir = self.gh_config.get('cache_dir')
+        if cache_dir is None:
+            cache_dir = self.repo_path / self._git('rev-parse', '--git-path', 'pages_cache')
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        self.wait_for_push()
+        return False
     
     def process_session(self, session_dir: Path):
         """Process single session"""
@@ -56,21 +277,16 @@ class GitHubPagesUpdater:
             print(f"⚠️  Unvollständige Session - überspringe")
             return False
         
-        with open(route_file) as f:
-            route = json.load(f)
-        
-        with open(surfaces_file) as f:
-            surfaces = json.load(f)
+        coordinates = load_route_coordinates(route_file)
+        surfaces = load_json(surfaces_file)
+        damages = load_json(damages_file)
         
-        with open(damages_file) as f:
-            damages = json.load(f)
-        
-        print(f"  📍 Route: {len(route['features'][0]['geometry']['coordinates'])} Punkte")
+        print(f"  📍 Route: {len(coordinates)} Punkte")
         print(f"  🛣️  Oberflächen: {len(surfaces)}")
         print(f"  ⚠️  Schäden: {len(damages)}")
         
         # Generate GeoJSON files
-        self.generate_route_geojson(session_dir.name, route, surfaces)
+        self.generate_route_geojson(session_dir.name, coordinates, surfaces)
         self.generate_damages_geojson(session_dir.name, damages)
         
         # Copy damage images
@@ -78,15 +294,18 @@ class GitHubPagesUpdater:
         
         return True
     
-    def generate_route_geojson(self, session_id, route, surfaces):
-        """Generate route GeoJSON with surface segments"""
+    def generate_route_geojson(self, session_id, coordinates, surfaces):
+        """Generate route GeoJSON with surface segments from an (N, 2|3) lon/lat[/alt] array"""
         features = []
         
         if not self.gh_config['geojson'].get('route_segments', True):
             # Simple full route
             features.append({
                 'type': 'Feature',
-                'geometry': route['features'][0]['geometry'],
+                'geometry': {
+                    'type': 'LineString',
+                    'coordinates': coordinates
+                },
                 'properties': {
                     'session_id': session_id,
                     'type': 'route'
@@ -94,9 +313,10 @@ class GitHubPagesUpdater:
             })
         else:
             # Segmented by surface type
-            segments = self.segment_by_surface(route['features'][0]['geometry']['coordinates'], surfaces)
+            segments = self.segment_by_surface(coordinates, surfaces)
+            colors = self.get_surface_colors(segment['surface_type'] for segment in segments)
             
-            for i, segment in enumerate(segments):
+            for i, (segment, color) in enumerate(zip(segments, colors)):
                 features.append({
                     'type': 'Feature',
                     'geometry': {
@@ -108,94 +328,135 @@ class GitHubPagesUpdater:
                         'segment_id': i,
                         'surface_type': segment['surface_type'],
                         'confidence': segment.get('confidence', 0.0),
-                        'color': self.get_surface_color(segment['surface_type'])
+                        'color': color
                     }
                 })
         
         # Save
-        output_file = self.data_dir / f"route_{session_id}.geojson"
-        geojson = {
-            'type': 'FeatureCollection',
-            'metadata': {
-                'session_id': session_id,
-                'generated': datetime.now().isoformat(),
-                'segments': len(features)
-            },
-            'features': features
-        }
-        
-        with open(output_file, 'w') as f:
-            json.dump(geojson, f, indent=2)
+        output_file = self.write_geojson(f"route_{session_id}", {
+            'session_id': session_id,
+            'generated': self._now_iso,
+            'segments': len(features)
+        }, features)
         
         print(f"  ✓ Route GeoJSON: {output_file}")
         return output_file
     
-    def segment_by_surface(self, coordinates, surfaces):
-        """Segment route by surface type changes"""
+    def segment_by_surface(self, coords, surfaces):
+        """Segment route (an (N, 2|3) lon/lat[/alt] array) by surface type changes"""
         if not surfaces:
             return [{
-                'coordinates': coordinates,
+                'coordinates': coords,
                 'surface_type': 'unknown',
                 'confidence': 0.0
             }]
         
-        segments = []
-        current_segment = {
-            'coordinates': [],
-            'surface_type': surfaces[0]['surface_type'],
-            'confidence': surfaces[0]['confidence']
-        }
+        if cKDTree is not None:
+            return self.segment_by_nearest_surface(coords, surfaces)
+        
+        # Route und Oberflächen in einer gemeinsamen lokalen Ebene (Meter)
+        n = len(coords)
+        xy = to_local_meters(np.concatenate((coords[:, 1], [s['latitude'] for s in surfaces])),
+                             np.concatenate((coords[:, 0], [s['longitude'] for s in surfaces])))
+        route_xy, surface_xy = xy[:n], xy[n:]
         
+        segments = []
+        seg_start = 0
+        search_from = 0
         surface_idx = 0
         
-        for coord in coordinates:
-            lon, lat = coord
+        # Jump from one surface change to the next instead of testing every point in Python
+        while surface_idx < len(surfaces) - 1:
+            hit = first_within(route_xy, search_from, surface_xy[surface_idx + 1], 5)
+            if hit is None:
+                break
             
-            # Check if we passed to next surface detection
-            if surface_idx < len(surfaces) - 1:
-                next_surface = surfaces[surface_idx + 1]
-                # Simple distance check
-                if geodesic and geodesic((lat, lon), 
-                                        (next_surface['latitude'], next_surface['longitude'])).meters < 5:
-                    # Save current segment
-                    if current_segment['coordinates']:
-                        segments.append(current_segment)
-                    
-                    # Start new segment
-                    surface_idx += 1
-                    current_segment = {
-                        'coordinates': [coord],
-                        'surface_type': next_surface['surface_type'],
-                        'confidence': next_surface['confidence']
-                    }
-                    continue
+            # Save current segment
+            if hit > seg_start:
+                segments.append({
+                    'coordinates': coords[seg_start:hit],
+                    'surface_type': surfaces[surface_idx]['surface_type'],
+                    'confidence': surfaces[surface_idx]['confidence']
+                })
             
-            current_segment['coordinates'].append(coord)
+            # Start new segment at the matching point
+            surface_idx += 1
+            seg_start = hit
+            search_from = hit + 1
         
         # Add last segment
-        if current_segment['coordinates']:
-            segments.append(current_segment)
+        if seg_start < len(coords):
+            segments.append({
+                'coordinates': coords[seg_start:],
+                'surface_type': surfaces[surface_idx]['surface_type'],
+                'confidence': surfaces[surface_idx]['confidence']
+            })
         
         return segments
     
+    def segment_by_nearest_surface(self, coords, surfaces):
+        """Assign every route point to its nearest surface detection and cut where it changes"""
+        if not len(coords):
+            return []
+        
+        n = len(coords)
+        surf_lat = np.array([s['latitude'] for s in surfaces], dtype=np.float64)
+        surf_lon = np.array([s['longitude'] for s in surfaces], dtype=np.float64)
+        
+        # Project route and surfaces into one common local frame
+        xy = to_local_meters(np.concatenate((coords[:, 1], surf_lat)),
+                             np.concatenate((coords[:, 0], surf_lon)))
+        _, idx = cKDTree(xy[n:]).query(xy[:n], k=1)
+        
+        bounds = np.flatnonzero(np.diff(idx)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [n]))
+        
+        return [{
+            'coordinates': coords[start:end],
+            'surface_type': surfaces[idx[start]]['surface_type'],
+            'confidence': surfaces[idx[start]]['confidence']
+        } for start, end in zip(starts, ends)]
+    
     def generate_damages_geojson(self, session_id, damages):
         """Generate damages GeoJSON with grouping"""
         # Group nearby damages
         grouped = self.group_damages(damages)
         
+        # Gruppen-Aggregate vektorisiert: alle Mitglieder hintereinander, Gruppen ab starts
+        members = [d for group in grouped for d in group]
+        sizes = np.fromiter((len(group) for group in grouped), dtype=np.intp, count=len(grouped))
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp)
+        
+        if members:
+            lats = np.fromiter((d['latitude'] for d in members), dtype=np.float64, count=len(members))
+            lons = np.fromiter((d['longitude'] for d in members), dtype=np.float64, count=len(members))
+            confs = np.fromiter((d['confidence'] for d in members), dtype=np.float64, count=len(members))
+            # Zeitstempel über Ränge minimieren/maximieren
+            ts_values, ts_ranks = np.unique([d['timestamp'] for d in members], return_inverse=True)
+            
+            avg_lats = (np.add.reduceat(lats, starts) / sizes).tolist()
+            avg_lons = (np.add.reduceat(lons, starts) / sizes).tolist()
+            avg_confs = (np.add.reduceat(confs, starts) / sizes).tolist()
+            best_confs = np.maximum.reduceat(confs, starts).tolist()
+            first_seen = ts_values[np.minimum.reduceat(ts_ranks, starts)].tolist()
+            last_seen = ts_values[np.maximum.reduceat(ts_ranks, starts)].tolist()
+        
         features = []
-        for group_id, group in enumerate(grouped, 1):
+        for i, group in enumerate(grouped):
+            group_id = i + 1
             # Calculate center
-            avg_lat = sum(d['latitude'] for d in group) / len(group)
-            avg_lon = sum(d['longitude'] for d in group) / len(group)
+            avg_lat = avg_lats[i]
+            avg_lon = avg_lons[i]
             
             # Get damage type (most common in group)
             damage_types = [d['damage_type'] for d in group]
-            damage_type = max(set(damage_types), key=damage_types.count)
+            damage_type = Counter(damage_types).most_common(1)[0][0]
             
-            # Severities
-            severities = [d['severity'] for d in group]
-            severity = 'high' if 'high' in severities else ('medium' if 'medium' in severities else 'low')
+            # Severities (höchste gewinnt, unbekannte zählen wie 'low')
+            severity = max((d['severity'] for d in group), key=lambda s: SEVERITY_RANK.get(s, 0))
+            if severity not in SEVERITY_RANK:
+                severity = 'low'
             
             # Images
             images = []
@@ -221,218 +482,398 @@ class GitHubPagesUpdater:
                     'severity': severity,
                     'image_count': len(images),
                     'images': images,
-                    'avg_confidence': sum(d['confidence'] for d in group) / len(group),
-                    'best_confidence': max(d['confidence'] for d in group),
-                    'first_seen': min(d['timestamp'] for d in group),
-                    'last_seen': max(d['timestamp'] for d in group)
+                    'avg_confidence': avg_confs[i],
+                    'best_confidence': best_confs[i],
+                    'first_seen': first_seen[i],
+                    'last_seen': last_seen[i]
                 }
             })
         
         # Save
-        output_file = self.data_dir / f"damages_{session_id}.geojson"
-        geojson = {
-            'type': 'FeatureCollection',
-            'metadata': {
-                'session_id': session_id,
-                'generated': datetime.now().isoformat(),
-                'total_groups': len(features),
-                'total_images': sum(len(f['properties']['images']) for f in features),
-                'grouping_distance_m': self.gh_config['geojson'].get('group_radius_m', 1.0)
-            },
-            'features': features
-        }
-        
-        with open(output_file, 'w') as f:
-            json.dump(geojson, f, indent=2)
+        output_file = self.write_geojson(f"damages_{session_id}", {
+            'session_id': session_id,
+            'generated': self._now_iso,
+            'total_groups': len(features),
+            'total_images': sum(len(f['properties']['images']) for f in features),
+            'grouping_distance_m': self.gh_config['geojson'].get('group_radius_m', 1.0)
+        }, features)
         
         print(f"  ✓ Damages GeoJSON: {output_file}")
         return output_file
     
+    def write_geojson(self, name, metadata, features):
+        """Write <name>.geojson, or GeoJSONSeq <name>.geojsonl in streaming mode"""
+        if self.streaming:
+            output_file = self.data_dir / f"{name}.geojsonl"
+            write_geojsonl(output_file, metadata, features)
+        else:
+            output_file = self.data_dir / f"{name}.geojson"
+            write_json(output_file, {
+                'type': 'FeatureCollection',
+                'metadata': metadata,
+                'features': features
+            }, self.pretty)
+        
+        self._dirty_paths.add(output_file)
+        return output_file
+    
     def group_damages(self, damages):
         """Group damages within radius"""
-        if not damages or not geodesic:
-            return [[d] for d in damages]
-        
         radius_m = self.gh_config['geojson'].get('group_radius_m', 1.0)
-        groups = []
-        used = set()
         
-        for i, damage in enumerate(damages):
-            if i in used:
-                continue
-            
-            group = [damage]
-            used.add(i)
-            
-            # Find nearby damages
-            for j, other in enumerate(damages):
-                if j in used or i == j:
-                    continue
-                
-                # Same damage type?
-                if damage['damage_type'] != other['damage_type']:
-                    continue
-                
-                # Within radius?
-                dist = geodesic(
-                    (damage['latitude'], damage['longitude']),
-                    (other['latitude'], other['longitude'])
-                ).meters
-                
-                if dist <= radius_m:
-                    group.append(other)
-                    used.add(j)
-            
-            groups.append(group)
+        if not damages:
+            return []
+        
+        if cKDTree is not None:
+            return self.group_damages_kdtree(damages, radius_m)
+        return self.group_damages_grid(damages, radius_m)
+    
+    def group_damages_kdtree(self, damages, radius_m):
+        """Group damages via KD-tree pairs within radius and their connected components"""
+        xy = to_local_meters([d['latitude'] for d in damages], [d['longitude'] for d in damages])
+        pairs = cKDTree(xy).query_pairs(radius_m, output_type='ndarray')
+        pairs = self.same_type_pairs(damages, pairs)
+        
+        n = len(damages)
+        graph = coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+        _, labels = connected_components(graph, directed=False)
         
-        return groups
+        return self.groups_from_labels(damages, labels)
+    
+    def group_damages_grid(self, damages, radius_m):
+        """Group damages via grid buckets and union-find (fallback without SciPy)"""
+        # Auf < 5 m ist die lokale Ebene so genau wie geodesic (Fehler < 1 mm)
+        xy = to_local_meters([d['latitude'] for d in damages], [d['longitude'] for d in damages]).tolist()
+        r2 = radius_m * radius_m
+        
+        # Zellen der Kantenlänge radius: Nachbarn liegen nur in den 3x3 umliegenden Zellen
+        cell = radius_m if radius_m > 0 else 1.0
+        buckets = defaultdict(list)
+        for i, (x, y) in enumerate(xy):
+            buckets[(int(x // cell), int(y // cell))].append(i)
+        
+        pairs = []
+        for (cx, cy), members in buckets.items():
+            candidates = [j for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                          for j in buckets.get((cx + dx, cy + dy), ())]
+            for i in members:
+                x, y = xy[i]
+                for j in candidates:
+                    if j > i:
+                        dx, dy = xy[j][0] - x, xy[j][1] - y
+                        if dx * dx + dy * dy <= r2:
+                            pairs.append((i, j))
+        
+        pairs = self.same_type_pairs(damages, np.array(pairs, dtype=np.intp).reshape(-1, 2))
+        return self.groups_from_labels(damages, union_find_labels(len(damages), pairs))
+    
+    def same_type_pairs(self, damages, pairs):
+        """Keep only pairs whose two damages have the same type"""
+        types = np.array([d['damage_type'] for d in damages], dtype=object)
+        return pairs[types[pairs[:, 0]] == types[pairs[:, 1]]]
+    
+    def groups_from_labels(self, damages, labels):
+        """Collect damages per component label, groups and members in input order"""
+        groups = {}
+        for damage, label in zip(damages, labels.tolist()):
+            groups.setdefault(label, []).append(damage)
+        return list(groups.values())
     
     def copy_damage_images(self, session_dir, damages):
         """Copy damage images to docs/images/"""
         session_images_dir = self.images_dir / session_dir.name
         session_images_dir.mkdir(exist_ok=True)
         
-        copied = 0
-        for damage in damages:
-            src = Path(damage['image_path'])
-            if src.exists():
-                dst = session_images_dir / src.name
-                shutil.copy(src, dst)
-                copied += 1
+        # Jedes Quellbild nur einmal kopieren (mehrere Schäden teilen sich oft ein Bild)
+        sources = {Path(damage['image_path']) for damage in damages}
         
-        print(f"  ✓ Bilder kopiert: {copied}")
+        # Bereits kopierte, unveränderte Bilder überspringen: Name -> (mtime_ns, size) der Quelle
+        # (liegt bei den übrigen Caches, nicht im veröffentlichten docs/images/)
+        memo_file = self.cache_dir / "copied" / f"{session_dir.name}.json"
+        memo_file.parent.mkdir(exist_ok=True)
+        try:
+            memo = load_json(memo_file) if memo_file.exists() else {}
+        except ValueError:
+            memo = {}
+        
+        def copy_image(src):
+            # copyfile nutzt sendfile/copy_file_range im Kernel und spart chmod/stat
+            dst = session_images_dir / src.name
+            try:
+                st = src.stat()
+                stamp = [st.st_mtime_ns, st.st_size]
+                if memo.get(src.name) == stamp and dst.exists():
+                    return dst, stamp, False
+                shutil.copyfile(src, dst)
+                return dst, stamp, True
+            except FileNotFoundError:
+                return None
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = [r for r in pool.map(copy_image, sources) if r is not None]
+        
+        copied = [dst for dst, _, fresh in results if fresh]
+        new_memo = {dst.name: stamp for dst, stamp, _ in results}
+        if new_memo != memo:
+            write_json(memo_file, new_memo)
+        
+        # Auch unveränderte Bilder eintragen: der Memo spart nur das Kopieren, nicht den
+        # Commit - nach --no-commit oder einem Git-Fehler wären sie sonst nie im Repo
+        self._dirty_paths.update(dst for dst, _, _ in results)
+        print(f"  ✓ Bilder kopiert: {len(copied)} (unverändert: {len(results) - len(copied)})")
     
     def get_surface_color(self, surface_type):
         """Get color for surface type"""
-        colors = {
-            'asphalt_excellent': '#27ae60',
-            'asphalt_good': '#2ecc71',
-            'asphalt_fair': '#f39c12',
-            'asphalt_poor': '#e74c3c',
-            'concrete': '#95a5a6',
-            'cobblestone': '#7f8c8d',
-            'paving_stones': '#8e44ad',
-            'gravel': '#d35400',
-            'dirt': '#795548'
-        }
-        return colors.get(surface_type, '#3498db')
+        return _COLOR_TUPLE[_CODE.get(surface_type, -1)]
+    
+    def get_surface_colors(self, surface_types):
+        """Get colors for a sequence of surface types in one gather"""
+        codes = np.fromiter((_CODE.get(t, -1) for t in surface_types), dtype=np.intp)
+        return _COLOR_ARRAY[codes].tolist()
     
     def generate_index_geojson(self):
         """Generate master index of all sessions"""
-        all_routes = list(self.data_dir.glob("route_*.geojson"))
-        all_damages = list(self.data_dir.glob("damages_*.geojson"))
+        all_routes = self.session_files("route_")
+        all_damages = self.session_files("damages_")
         
         index = {
             'sessions': [],
             'total_routes': len(all_routes),
             'total_damage_files': len(all_damages),
-            'last_updated': datetime.now().isoformat()
+            'last_updated': self._now_iso
         }
         
-        for route_file in sorted(all_routes):
-            session_id = route_file.stem.replace('route_', '')
-            damage_file = self.data_dir / f"damages_{session_id}.geojson"
+        # Metadata cache keyed by file mtime - only changed files are parsed again
+        cache_file = self.cache_dir / "index_cache.json"
+        try:
+            cache = load_json(cache_file) if cache_file.exists() else {}
+        except ValueError:
+            cache = {}
+        new_cache = {}
+        
+        for session_id, route_file in sorted(all_routes.items()):
+            damage_file = all_damages.get(session_id)
             
-            with open(route_file) as f:
-                route_data = json.load(f)
+            route_meta = self.cached_metadata(route_file, cache, new_cache)
             
             session_info = {
                 'id': session_id,
                 'route_file': route_file.name,
-                'damage_file': damage_file.name if damage_file.exists() else None,
-                'segments': route_data['metadata'].get('segments', 0)
+                'damage_file': damage_file.name if damage_file else None,
+                'segments': route_meta.get('segments', 0)
             }
             
-            if damage_file.exists():
-                with open(damage_file) as f:
-                    damage_data = json.load(f)
-                session_info['damages'] = damage_data['metadata']['total_groups']
-                session_info['damage_images'] = damage_data['metadata']['total_images']
+            if damage_file:
+                damage_meta = self.cached_metadata(damage_file, cache, new_cache)
+                session_info['damages'] = damage_meta['total_groups']
+                session_info['damage_images'] = damage_meta['total_images']
             
             index['sessions'].append(session_info)
         
         # Save index
         index_file = self.data_dir / "index.json"
-        with open(index_file, 'w') as f:
-            json.dump(index, f, indent=2)
+        write_json(index_file, index, self.pretty)
+        write_json(cache_file, new_cache)
+        self._dirty_paths.add(index_file)
         
         print(f"\n✓ Index erstellt: {index_file}")
         print(f"  Sessions: {len(index['sessions'])}")
     
+    def session_files(self, prefix):
+        """Map session id -> newest <prefix><id>.geojson / .geojsonl in data_dir"""
+        files = {}
+        for path in sorted(self.data_dir.glob(f"{prefix}*.geojson*"), key=lambda p: p.stat().st_mtime_ns):
+            if path.suffix in ('.geojson', '.geojsonl'):
+                files[path.stem[len(prefix):]] = path
+        return files
+    
+    def cached_metadata(self, path, cache, new_cache):
+        """Get index-relevant metadata of a GeoJSON file, parsing it only if its mtime changed"""
+        mtime = path.stat().st_mtime_ns
+        entry = cache.get(path.name)
+        
+        if entry and entry.get('mtime') == mtime:
+            metadata = entry['metadata']
+        else:
+            metadata = load_metadata(path)
+            metadata = {k: metadata[k] for k in ('segments', 'total_groups', 'total_images') if k in metadata}
+        
+        new_cache[path.name] = {'mtime': mtime, 'metadata': metadata}
+        return metadata
+    
     def git_commit_push(self, message=None):
-        """Git commit and push changes"""
+        """Queue a commit for the changes written so far (committed on flush())"""
         if not self.gh_config.get('auto_commit', True):
             print("\n⊘ Auto-Commit deaktiviert")
             return
         
-        message = message or f"Auto-Update: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        message = message or f"Auto-Update: {self._now.strftime('%Y-%m-%d %H:%M:%S')}"
+        self._pending_messages.append(message)
+    
+    def flush(self):
+        """Commit all queued changes at once and start the push in the background"""
+        if not self._pending_messages:
+            return
+        
+        messages, self._pending_messages = self._pending_messages, []
+        if len(messages) == 1:
+            message = messages[0]
+        else:
+            message = f"Auto-Update: {len(messages)} Sessions\n\n" + "\n".join(messages)
         
         print(f"\n📤 Git Commit & Push...")
-        print(f"   Message: {message}")
+        print(f"   Message: {messages[0]}" + (f" (+{len(messages) - 1})" if len(messages) > 1 else ""))
+        
+        if not self._dirty_paths:
+            print("  ⊘ Keine Änderungen zum Committen")
+            return
+        
+        # Git-Plumbing: nur die geschriebenen Dateien hashen und eintragen - kein Scan von docs/
+        paths = [str(p.relative_to(self.repo_path)) for p in sorted(self._dirty_paths)]
         
         try:
-            # Configure git user
-            subprocess.run(['git', 'config', 'user.name', self.gh_config.get('git_user', 'Bike Surface AI')], 
-                          cwd=self.repo_path, check=True)
-            subprocess.run(['git', 'config', 'user.email', self.gh_config.get('git_email', 'bike-ai@example.com')],
-                          cwd=self.repo_path, check=True)
+            shas = self._git('hash-object', '-w', '--stdin-paths', input="\n".join(paths)).split()
+            self._git('update-index', '--add', '--index-info',
+                      input="".join(f"100644 {sha}\t{path}\n" for sha, path in zip(shas, paths)))
+            tree = self._git('write-tree')
             
-            # Add docs folder
-            subprocess.run(['git', 'add', 'docs/'], cwd=self.repo_path, check=True)
+            parent = self._git('rev-parse', '--verify', '-q', 'HEAD', check=False)
+            if parent and tree == self._git('rev-parse', f'{parent}^{{tree}}'):
+                print("  ⊘ Keine Änderungen zum Committen")
+                self._dirty_paths.clear()
+                return
             
             # Commit
-            result = subprocess.run(['git', 'commit', '-m', message], 
-                                   cwd=self.repo_path, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                if "nothing to commit" in result.stdout:
-                    print("  ⊘ Keine Änderungen zum Committen")
-                    return
-                else:
-                    print(f"  ⚠️  Commit-Warnung: {result.stdout}")
+            commit = self._git('commit-tree', tree, *(['-p', parent] if parent else []), '-m', message)
+            self._git('update-ref', '-m', f'commit: {messages[0]}', 'HEAD', commit, *([parent] if parent else []))
             
-            # Push
-            branch = self.gh_config.get('branch', 'main')
-            subprocess.run(['git', 'push', 'origin', branch], cwd=self.repo_path, check=True)
-            
-            print("  ✅ Erfolgreich gepusht!")
+            self._dirty_paths.clear()
+            self._start_push()
             
         except subprocess.CalledProcessError as e:
             print(f"  ❌ Git-Fehler: {e}")
             print(f"     Führe manuell aus: cd {self.repo_path} && git push")
+    
+    def wait_for_push(self):
+        """Wait for a running background push and report its result"""
+        if self._push_proc is None:
+            return True
+        
+        stdout, stderr = self._push_proc.communicate()
+        ok = self._push_proc.returncode == 0
+        self._push_proc = None
+        
+        if ok:
+            print("  ✅ Erfolgreich gepusht!")
+        else:
+            print(f"  ❌ Git-Fehler beim Push: {(stderr or stdout).strip()}")
+            print(f"     Führe manuell aus: cd {self.repo_path} && git push")
+        return ok
+    
+    def _git(self, *args, input=None, check=True):
+        """Run a git command in the repo and return its stripped stdout"""
+        result = subprocess.run(['git', *args], cwd=self.repo_path, env=self._git_env,
+                                input=input, capture_output=True, text=True, check=check)
+        return result.stdout.strip()
+    
+    def _start_push(self):
+        """Push in the background so processing can continue"""
+        self.wait_for_push()
+        
+        branch = self.gh_config.get('branch', 'main')
+        self._push_proc = subprocess.Popen(['git', 'push', '--porcelain', 'origin', branch],
+                                           cwd=self.repo_path, env=self._git_env, stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE, text=True)
+        print("  📤 Push läuft im Hintergrund...")
+
+
+def _process_session_worker(job):
+    """Process one session in a worker process; returns (session, success, written paths, error)"""
+    config_path, session_dir, now = job
+    try:
+        updater = GitHubPagesUpdater(config_path, now)
+        ok = updater.process_session(session_dir)
+    except Exception as e:
+        # Eine defekte Session darf den restlichen Batch nicht abbrechen
+        return session_dir, False, set(), f"{type(e).__name__}: {e}"
+    return session_dir, ok, updater._dirty_paths, None
+
+
+def run_batch(updater, config_path, batch_dir, commit=True):
+    """Process all sessions of batch_dir in parallel, then index and commit once"""
+    sessions = sorted(p for p in Path(batch_dir).iterdir() if p.is_dir())
+    if not sessions:
+        print(f"⚠️  Keine Sessions in {batch_dir}")
+        return 0
+    
+    print(f"📦 Batch: {len(sessions)} Sessions")
+    
+    # Generierung parallel, Git bleibt seriell im Hauptprozess
+    processed = []
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        for session_dir, ok, dirty_paths, error in pool.map(
+                _process_session_worker, [(config_path, s, updater._now) for s in sessions]):
+            if error:
+                print(f"❌ Fehler in Session {session_dir.name}: {error}")
+            if ok:
+                processed.append(session_dir)
+                updater._dirty_paths.update(dirty_paths)
+    
+    if processed:
+        updater.generate_index_geojson()
+        if commit:
+            updater.git_commit_push(f"Update: {len(processed)} Sessions")
+    
+    print(f"\n✓ Verarbeitet: {len(processed)}/{len(sessions)} Sessions")
+    return len(processed)
 
 
 def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='GitHub Pages Updater')
-    parser.add_argument('session_dir', help='Session-Verzeichnis')
+    parser.add_argument('session_dir', nargs='?', help='Session-Verzeichnis')
+    parser.add_argument('--batch', metavar='DIR', help='Alle Sessions in DIR parallel verarbeiten')
     parser.add_argument('--no-commit', action='store_true', help='Nicht committen')
     parser.add_argument('--config', default='config_auto_live.yaml', help='Config file')
     
     args = parser.parse_args()
     
-    updater = GitHubPagesUpdater(args.config)
+    if args.batch:
+        if not Path(args.batch).is_dir():
+            print(f"❌ Batch-Verzeichnis nicht gefunden: {args.batch}")
+            return 1
+        
+        with GitHubPagesUpdater(args.config) as updater:
+            processed = run_batch(updater, args.config, args.batch, commit=not args.no_commit)
+        
+        print("\n✅ Fertig!" if processed else "\n❌ Keine Session verarbeitet")
+        return 0 if processed else 1
+    
+    if not args.session_dir:
+        parser.error("session_dir oder --batch angeben")
     
     session_path = Path(args.session_dir)
     if not session_path.exists():
         print(f"❌ Session nicht gefunden: {session_path}")
         return 1
     
-    # Process session
-    if updater.process_session(session_path):
+    # Commit & Push laufen beim Verlassen des with-Blocks
+    with GitHubPagesUpdater(args.config) as updater:
+        # Process session
+        if not updater.process_session(session_path):
+            print("\n❌ Fehler beim Verarbeiten")
+            return 1
+        
         # Generate index
         updater.generate_index_geojson()
         
         # Git commit
         if not args.no_commit:
             updater.git_commit_push(f"Update: Session {session_path.name}")
-        
-        print("\n✅ Fertig!")
-        return 0
-    else:
-        print("\n❌ Fehler beim Verarbeiten")
-        return 1
+    
+    print("\n✅ Fertig!")
+    return 0
 
 
 if __name__ == "__main__":
@@ -4,19 +4,124 @@ Web-UI für Bike Surface AI - Flask Server
 Stabil und ohne GUI-Probleme
 """
 
-from flask import Flask, render_template, jsonify, request, Response, send_from_directory
+from flask import Flask, render_template, jsonify, request, Response, send_from_directory, abort
+from werkzeug.utils import safe_join
 import subprocess
 import json
+import re
 import time
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import quote
 import signal
 import os
+import glob
+import mimetypes
+import heapq
 import cv2
+import numpy as np
 import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# GPS (optional - Web-UI läuft auch ohne pyserial/pynmea2)
+try:
+    from gps_module import GPSBackground
+except Exception:
+    GPSBackground = None
+
+# lxml für schnelles GPX-Parsing (optional, Fallback: xml.etree)
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+# Schnelle JSON-(De)Serialisierung (optional, Fallback: stdlib json / jsonify)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# libjpeg-turbo direkt (SIMD) für den Stream - Fallback: cv2.imencode
+try:
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
+# Shared-Memory Vorschau von simple_capture.py während der Aufnahme (optional)
+try:
+    from preview_buffer import PreviewReader
+except ImportError:
+    PreviewReader = None
 
 app = Flask(__name__)
 
+STREAM_JPEG_QUALITY = 85
+STREAM_INTERVAL = 0.05  # ~20 FPS
+STREAM_SIZE = (640, 360)
+IMAGE_MAX_AGE = 3600  # Browser-Cache für aufgenommene Bilder (s)
+STATIC_MAX_AGE = 3600  # Browser-Cache für Demo-/Schadens-/Oberflächenbilder (s)
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = STATIC_MAX_AGE
+
+# Dateiauslieferung an einen vorgeschalteten Webserver abgeben (Standard: aus, waitress liefert selbst)
+#   WEBUI_SENDFILE=x-sendfile -> X-Sendfile-Header (Apache/lighttpd), gilt für alle send_file-Antworten
+#   WEBUI_SENDFILE=x-accel    -> X-Accel-Redirect für static/damages/surfaces/routes (nginx), z.B.:
+#       location /_protected/ { internal; alias /home/jetson/bike-surface-ai/edge/; }
+SENDFILE_MODE = os.environ.get('WEBUI_SENDFILE', '').lower()
+ACCEL_PREFIX = '/_protected'
+app.config['USE_X_SENDFILE'] = SENDFILE_MODE == 'x-sendfile'
+
+# Pfade einmal beim Import bestimmen statt pro Request
+EDGE_DIR = Path(__file__).resolve().parent
+DATA_DIR = EDGE_DIR / 'data_collection'
+SESSIONS_DIR = EDGE_DIR / 'live_sessions'
+LIVE_STATE_FILE = EDGE_DIR / 'live_state.json'
+CAPTURE_SCRIPT = EDGE_DIR / 'simple_capture.py'
+LIVE_SCRIPT = EDGE_DIR / 'auto_live_system.py'
+STATIC_DIR = EDGE_DIR / 'static'
+DAMAGES_DIR = EDGE_DIR / 'damages'
+SURFACES_DIR = EDGE_DIR / 'surfaces'
+ROUTES_DIR = EDGE_DIR / 'routes'
+TEMPLATES_DIR = EDGE_DIR / 'templates'
+PREVIEW_TIMEOUT = 2.0  # ohne neue Vorschau-Frames -> Placeholder
+
+
+def load_json(path):
+    """Load a JSON file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def write_json(path, data):
+    """Write a JSON file with indent=2 atomically (temp file + os.replace)"""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    if orjson:
+        with open(tmp, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2)
+    # Ein Abbruch mitten im Schreiben lässt die alte Datei unversehrt
+    os.replace(tmp, path)
+
+
+def json_response(data):
+    """JSON response for frequently polled endpoints (orjson instead of jsonify)"""
+    if orjson:
+        return Response(orjson.dumps(data), mimetype='application/json')
+    return jsonify(data)
+
+
+def encode_jpeg(frame, quality=STREAM_JPEG_QUALITY):
+    """Encode a BGR frame as JPEG bytes"""
+    if simplejpeg is not None:
+        return simplejpeg.encode_jpeg(frame, quality=quality, colorspace='BGR', fastdct=True)
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
 # Kamera für Live-Stream
 camera_lock = threading.Lock()
 camera = None
@@ -37,9 +142,107 @@ auto_process = None
 auto_lock = threading.Lock()
 demo_mode = False  # Start in production mode by default
 
+# Demo-Route (GPX einmal parsen, Ergebnis wiederverwenden)
+GPX_FILE = EDGE_DIR / 'demo_route' / 'Tour14.gpx'
+GPX_NS = 'http://www.topografix.com/GPX/1/1'
+DEMO_SEED = 14
+_demo_route = None
+_demo_route_lock = threading.Lock()
+
+# Zusammenfassungen der live_sessions: Name -> (mtime_ns von stats.json, Summary)
+SESSIONS_READ_WORKERS = 16
+_summary_cache = {}
+
+# Kamera-Probe (Geräteliste, v4l2-Name) - nur alle HW_PROBE_TTL Sekunden neu
+HW_PROBE_TTL = 10.0
+_hw_probe_cache = {'t': 0.0, 'data': None}
+_hw_probe_lock = threading.Lock()
+
+# Listing-Infos abgeschlossener Sessions (LRU, Schlüssel enthält die mtimes)
+SESSIONS_CACHE_SIZE = 256
+_sessions_cache = OrderedDict()
+_sessions_lock = threading.Lock()
+
 # Global GPS module to maintain satellite count cache
+GPS_CONFIG = {
+    'port': '/dev/ttyACM0',
+    'baudrate': 9600,
+    'timeout': 1.0
+}
 gps_module = None
 gps_last_position = None
+gps_lock = threading.Lock()
+
+
+def _gps_owned_by_subprocess():
+    """True while simple_capture.py or auto_live_system.py reads the GPS tty itself"""
+    for process in (state.get('process'), auto_process):
+        if process is not None and process.poll() is None:
+            return True
+    return False
+
+
+def get_gps():
+    """Shared background GPS reader, created on first use (None if unavailable or in use)"""
+    global gps_module
+    if GPSBackground is None:
+        return None
+    with gps_lock:
+        # Zwei Leser am selben tty teilen sich die NMEA-Zeilen - Port nicht wieder öffnen
+        if _gps_owned_by_subprocess():
+            return None
+        if gps_module is None:
+            gps_module = GPSBackground(GPS_CONFIG)
+        return gps_module
+
+
+def release_gps():
+    """Stop the UI reader and free the tty for a capture/live process (caller holds gps_lock)"""
+    global gps_module
+    if gps_module is not None:
+        try:
+            gps_module.close()
+        except Exception as e:
+            print(f"GPS close error: {e}")
+        gps_module = None
+
+
+# Fortschrittszeile von simple_capture.py
+_IMAGE_LINE = re.compile(r'📸 Bild (\d+) \|.*Dist: ([\d.]+)m')
+
+
+def _read_capture_output(process, stats):
+    """Follow simple_capture.py output and update the image/distance counters"""
+    for line in process.stdout:
+        match = _IMAGE_LINE.search(line)
+        if match:
+            stats['images'] = int(match.group(1))
+            stats['distance'] = float(match.group(2))
+
+
+def _count_jpgs(path):
+    """Count .jpg files in a directory without stat calls"""
+    with os.scandir(path) as it:
+        return sum(1 for entry in it if entry.name.endswith('.jpg'))
+
+
+def _dir_size(path, count_jpgs_in=None):
+    """Total file size below path via os.scandir; also counts .jpg files directly in count_jpgs_in"""
+    count_dir = os.fspath(count_jpgs_in) if count_jpgs_in is not None else None
+    total = 0
+    jpgs = 0
+    stack = [os.fspath(path)]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total += entry.stat(follow_symlinks=False).st_size
+                    if current == count_dir and entry.name.endswith('.jpg'):
+                        jpgs += 1
+    return total, jpgs
 
 
 @app.route('/')
@@ -57,11 +260,7 @@ def get_status():
         'stats': state['stats']
     }
     
-    # Zähle Bilder wenn läuft
-    if state['is_running'] and state['output_dir']:
-        images_dir = Path(state['output_dir']) / 'images'
-        if images_dir.exists():
-            state['stats']['images'] = len(list(images_dir.glob('*.jpg')))
+    # Bildzähler kommt vom Output-Reader (O(1) statt Verzeichnis-Scan)
     
     # Berechne Laufzeit
     if state['start_time']:
@@ -70,7 +269,7 @@ def get_status():
     else:
         status['runtime'] = "00:00:00"
     
-    return jsonify(status)
+    return json_response(status)
 
 @app.route('/api/start', methods=['POST'])
 def start_capture():
@@ -88,27 +287,34 @@ def start_capture():
         
         # Erstelle Output-Dir
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_dir = Path(__file__).parent / f"data_collection/{timestamp}"
+        output_dir = DATA_DIR / timestamp
         output_dir.mkdir(parents=True, exist_ok=True)
         (output_dir / "images").mkdir(exist_ok=True)
         
         state['output_dir'] = output_dir
         
-        # Starte simple_capture.py
-        script_path = Path(__file__).parent / "simple_capture.py"
+        # Vorschau-Segment muss existieren, bevor simple_capture.py startet
+        get_preview()
         
-        state['process'] = subprocess.Popen(
-            ['python3', str(script_path), str(output_dir)],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,  # Alle Logs zu stdout
-            bufsize=1,
-            universal_newlines=True
-        )
+        # Starte simple_capture.py - GPS-Port vorher freigeben, der Prozess liest ihn selbst
+        with gps_lock:
+            release_gps()
+            state['process'] = subprocess.Popen(
+                ['python3', '-u', str(CAPTURE_SCRIPT), str(output_dir)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,  # Alle Logs zu stdout
+                bufsize=1,
+                universal_newlines=True
+            )
         
         state['is_running'] = True
         state['start_time'] = time.time()
         state['stats'] = {'images': 0, 'distance': 0}
         
+        # Output mitlesen: zählt Bilder und leert die Pipe
+        threading.Thread(target=_read_capture_output,
+                         args=(state['process'], state['stats']), daemon=True).start()
+        
         return jsonify({'success': True, 'output_dir': str(output_dir)})
         
     except Exception as e:
@@ -130,11 +336,11 @@ def stop_capture():
                 state['process'].kill()
                 state['process'].wait()
         
-        # Zähle finale Bilder
+        # Zähle finale Bilder (Abgleich mit dem Zähler)
         if state['output_dir']:
             images_dir = Path(state['output_dir']) / 'images'
             if images_dir.exists():
-                state['stats']['images'] = len(list(images_dir.glob('*.jpg')))
+                state['stats']['images'] = _count_jpgs(images_dir)
         
         result = {
             'success': True,
@@ -158,37 +364,74 @@ def stop_capture():
         state['start_time'] = None
         return jsonify({'error': str(e)}), 500
 
+def _mtime_ns(path):
+    """mtime of path in ns, 0 if missing"""
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _session_cache_key(session_dir):
+    """Cache key changing whenever files are added to the session or its metadata is rewritten"""
+    return (session_dir.name, _mtime_ns(session_dir), _mtime_ns(session_dir / "images"),
+            _mtime_ns(session_dir / "metadata.json"))
+
+
+def _scan_session(session_dir, use_metadata=True):
+    """Collect listing info for one data_collection session"""
+    metadata_file = session_dir / "metadata.json"
+    metadata = {}
+    if metadata_file.exists():
+        metadata = load_json(metadata_file)
+    
+    # simple_capture schreibt size_bytes nur beim regulären Beenden (complete) -
+    # ältere oder abgebrochene Sessions per scandir
+    if use_metadata and metadata.get('complete') and metadata.get('size_bytes') is not None:
+        folder_size = metadata['size_bytes']
+        image_count = metadata.get('total_images', 0)
+    else:
+        # Ordnergröße und Bildanzahl in einem scandir-Durchlauf
+        folder_size, image_count = _dir_size(session_dir, count_jpgs_in=session_dir / "images")
+    folder_size_mb = folder_size / (1024 * 1024)
+    
+    return {
+        'name': session_dir.name,
+        'images': image_count,
+        'size_mb': round(folder_size_mb, 2),
+        'path': str(session_dir),
+        'metadata': metadata
+    }
+
+
 @app.route('/api/sessions')
 def get_sessions():
     """Liste alle Aufnahme-Sessions"""
-    data_dir = Path(__file__).parent / "data_collection"
-    
-    if not data_dir.exists():
+    if not DATA_DIR.exists():
         return jsonify([])
     
+    active_dir = Path(state['output_dir']) if state['is_running'] and state['output_dir'] else None
+    
     sessions = []
-    for session_dir in sorted(data_dir.iterdir(), reverse=True):
+    for session_dir in sorted(DATA_DIR.iterdir(), reverse=True):
         if session_dir.is_dir():
-            images_dir = session_dir / "images"
-            image_count = len(list(images_dir.glob('*.jpg'))) if images_dir.exists() else 0
-            
-            # Berechne Ordnergröße
-            folder_size = sum(f.stat().st_size for f in session_dir.rglob('*') if f.is_file())
-            folder_size_mb = folder_size / (1024 * 1024)
-            
-            metadata_file = session_dir / "metadata.json"
-            metadata = {}
-            if metadata_file.exists():
-                with open(metadata_file) as f:
-                    metadata = json.load(f)
+            # Abgeschlossene Sessions aus dem Cache, nur die laufende wird immer neu gescannt
+            if session_dir == active_dir:
+                sessions.append(_scan_session(session_dir, use_metadata=False))
+                continue
             
-            sessions.append({
-                'name': session_dir.name,
-                'images': image_count,
-                'size_mb': round(folder_size_mb, 2),
-                'path': str(session_dir),
-                'metadata': metadata
-            })
+            key = _session_cache_key(session_dir)
+            with _sessions_lock:
+                info = _sessions_cache.get(key)
+                if info is not None:
+                    _sessions_cache.move_to_end(key)
+            if info is None:
+                info = _scan_session(session_dir)
+                with _sessions_lock:
+                    _sessions_cache[key] = info
+                    if len(_sessions_cache) > SESSIONS_CACHE_SIZE:
+                        _sessions_cache.popitem(last=False)
+            sessions.append(info)
     
     return jsonify(sessions)
 
@@ -202,35 +445,134 @@ def get_camera():
     
     with camera_lock:
         if camera is None or not camera.isOpened():
-            camera = cv2.VideoCapture(0)
-            camera.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
-            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
+            camera = cv2.VideoCapture(0, cv2.CAP_V4L2)
+            # MJPG ohne RGB-Konvertierung: retrieve() liefert den JPEG-Bitstream der Kamera
+            camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            camera.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+            # Stream-Auflösung direkt von der Kamera statt cv2.resize
+            camera.set(cv2.CAP_PROP_FRAME_WIDTH, STREAM_SIZE[0])
+            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, STREAM_SIZE[1])
             camera.set(cv2.CAP_PROP_FPS, 10)
         return camera
 
-def generate_frames():
-    """Generiere MJPEG Stream"""
+class _LatestFrame:
+    """Latest MJPEG chunk, shared by all stream clients"""
+    
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._chunk = None
+        self._seq = 0
+        self.consumers = 0
+    
+    def publish(self, chunk):
+        """Store a new chunk and wake all waiting clients"""
+        with self._cond:
+            self._chunk = chunk
+            self._seq += 1
+            self._cond.notify_all()
+    
+    def attach(self):
+        """Register a stream client and wake the producer"""
+        with self._cond:
+            self.consumers += 1
+            self._cond.notify_all()
+    
+    def detach(self):
+        """Unregister a stream client"""
+        with self._cond:
+            self.consumers -= 1
+    
+    def wait_for_consumers(self, timeout=None):
+        """Block the producer until at least one client is connected"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.consumers > 0, timeout)
+    
+    def wait(self, last_seq, timeout=1.0):
+        """Wait for a chunk newer than last_seq; returns (seq, chunk)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != last_seq, timeout)
+            return self._seq, self._chunk
+
+
+latest_frame = _LatestFrame()
+_producer_thread = None
+_producer_lock = threading.Lock()
+
+
+FRAME_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+
+
+def _frame_chunk(frame_bytes):
+    """Wrap JPEG bytes as one multipart chunk (one allocation, two copies)"""
+    head = len(FRAME_HEADER)
+    buf = bytearray(head + len(frame_bytes) + 2)
+    buf[:head] = FRAME_HEADER
+    buf[head:-2] = frame_bytes
+    buf[-2:] = b'\r\n'
+    return bytes(buf)
+
+
+@lru_cache(maxsize=1)
+def _placeholder_chunk():
+    """Multipart chunk of the 'Aufnahme läuft' placeholder (constant, built once)"""
+    # Schwarzes Bild mit Text
+    placeholder = np.zeros((360, 640, 3), dtype=np.uint8)
+    cv2.putText(placeholder, 'AUFNAHME LAEUFT', (150, 180), 
+               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    cv2.putText(placeholder, 'Kamera wird genutzt', (180, 220), 
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+    return _frame_chunk(encode_jpeg(placeholder))
+
+
+_preview = None
+_preview_lock = threading.Lock()
+
+
+def get_preview():
+    """Shared-memory preview segment (created once per process), None if unavailable"""
+    global _preview
+    with _preview_lock:
+        if _preview is None and PreviewReader is not None:
+            try:
+                _preview = PreviewReader()
+            except Exception as e:
+                print(f"⚠️  Live-Vorschau nicht verfügbar: {e}")
+                _preview = False
+        return _preview or None
+
+
+def _frame_producer():
+    """Einziger Besitzer der Kamera: grabbt/encodet einmal und verteilt an alle Clients"""
     global capture_flash
     
+    next_emit = 0.0
+    preview_seq = 0
+    preview_time = 0.0
+    
     while True:
         try:
-            # Wenn Capture läuft, zeige Placeholder
+            # Ohne Zuschauer nichts grabben oder encoden - schläft bis ein Client kommt
+            if not latest_frame.wait_for_consumers():
+                continue
+            
+            # Wenn Capture läuft: Vorschau aus dem Shared Memory, sonst Placeholder
             if state['is_running']:
-                # Schwarzes Bild mit Text
-                import numpy as np
-                placeholder = np.zeros((360, 640, 3), dtype=np.uint8)
-                cv2.putText(placeholder, 'AUFNAHME LAEUFT', (150, 180), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                cv2.putText(placeholder, 'Kamera wird genutzt', (180, 220), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-                
-                ret, buffer = cv2.imencode('.jpg', placeholder, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                frame_bytes = buffer.tobytes()
-                
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                
-                time.sleep(0.5)
+                preview = get_preview()
+                frame = None
+                if preview:
+                    preview_seq, frame = preview.read(preview_seq)
+                now = time.monotonic()
+                if frame is not None:
+                    preview_time = now
+                    latest_frame.publish(_frame_chunk(encode_jpeg(frame)))
+                    time.sleep(STREAM_INTERVAL)
+                elif now - preview_time > PREVIEW_TIMEOUT:
+                    # Placeholder regelmäßig neu senden: der Browser zeigt einen Part erst
+                    # bei der nächsten Boundary, und nur ein Write erkennt getrennte Clients
+                    latest_frame.publish(_placeholder_chunk())
+                    time.sleep(0.5)
+                else:
+                    time.sleep(STREAM_INTERVAL)
                 continue
             
             cam = get_camera()
@@ -238,38 +580,78 @@ def generate_frames():
                 time.sleep(0.5)
                 continue
                 
-            success, frame = cam.read()
-            
-            if not success:
+            # grab() blockiert im Kamera-Takt; dekodiert wird nur, was gesendet wird
+            if not cam.grab():
                 time.sleep(0.1)
                 continue
             
-            # Resize für Stream (640x360 für Performance)
-            stream_frame = cv2.resize(frame, (640, 360))
+            now = time.monotonic()
+            if now < next_emit:
+                continue
+            next_emit = now + STREAM_INTERVAL
             
-            # Roter Rahmen bei Capture
-            if capture_flash:
-                cv2.rectangle(stream_frame, (0, 0), (639, 359), (0, 0, 255), 10)
-                capture_flash = False
+            success, frame = cam.retrieve()
             
-            # Encode als JPEG
-            ret, buffer = cv2.imencode('.jpg', stream_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            frame_bytes = buffer.tobytes()
+            if not success:
+                time.sleep(0.1)
+                continue
             
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            if frame.ndim == 1 and not capture_flash:
+                # Rohes MJPG: unverändert weiterreichen, kein Decode/Encode
+                frame_bytes = frame.tobytes()
+            else:
+                if frame.ndim == 1:
+                    frame = cv2.imdecode(frame, cv2.IMREAD_COLOR)
+                
+                # Resize für Stream (640x360 für Performance)
+                stream_frame = cv2.resize(frame, STREAM_SIZE)
+                
+                # Roter Rahmen bei Capture
+                if capture_flash:
+                    cv2.rectangle(stream_frame, (0, 0), (STREAM_SIZE[0] - 1, STREAM_SIZE[1] - 1),
+                                  (0, 0, 255), 10)
+                    capture_flash = False
+                
+                # Encode als JPEG
+                frame_bytes = encode_jpeg(stream_frame)
             
-            time.sleep(0.05)  # ~20 FPS
+            latest_frame.publish(_frame_chunk(frame_bytes))
             
         except Exception as e:
             print(f"Stream error: {e}")
             time.sleep(1)
 
+def _ensure_producer():
+    """Start the frame producer thread on first use"""
+    global _producer_thread
+    with _producer_lock:
+        if _producer_thread is None or not _producer_thread.is_alive():
+            _producer_thread = threading.Thread(target=_frame_producer, daemon=True)
+            _producer_thread.start()
+
+
+def generate_frames():
+    """Generiere MJPEG Stream - liest nur den zuletzt produzierten Frame"""
+    _ensure_producer()
+    
+    latest_frame.attach()
+    try:
+        seq = 0
+        while True:
+            new_seq, chunk = latest_frame.wait(seq)
+            if new_seq == seq or chunk is None:
+                continue
+            seq = new_seq
+            yield chunk
+    finally:
+        latest_frame.detach()
+
 @app.route('/video_feed')
 def video_feed():
     """Video-Stream Endpoint"""
     return Response(generate_frames(),
-                   mimetype='multipart/x-mixed-replace; boundary=frame')
+                   mimetype='multipart/x-mixed-replace; boundary=frame',
+                   direct_passthrough=True)
 
 @app.route('/api/capture_flash', methods=['POST'])
 def trigger_capture_flash():
@@ -288,27 +670,43 @@ def get_latest_images():
     if not images_dir.exists():
         return jsonify([])
     
-    # Hole letzte 5 Bilder
-    images = sorted(images_dir.glob('*.jpg'), key=lambda p: p.stat().st_mtime, reverse=True)[:5]
+    # Hole letzte 5 Bilder: ein stat() pro Datei, Heap statt komplettem Sortieren
+    with os.scandir(images_dir) as it:
+        entries = [(entry.name, entry.stat()) for entry in it if entry.name.endswith('.jpg')]
+    latest = heapq.nlargest(5, entries, key=lambda item: item[1].st_mtime)
     
+    rel_dir = images_dir.relative_to(EDGE_DIR)
     result = []
-    for img in images:
+    for name, st in latest:
         result.append({
-            'name': img.name,
-            'path': str(img.relative_to(Path(__file__).parent)),
-            'size': img.stat().st_size,
-            'time': img.stat().st_mtime
+            'name': name,
+            'path': str(rel_dir / name),
+            'size': st.st_size,
+            'time': st.st_mtime
         })
     
     return jsonify(result)
 
+@lru_cache(maxsize=1024)
+def _resolve_image(filepath):
+    """Resolved .jpg path inside the edge directory, None for anything outside"""
+    full_path = (EDGE_DIR / filepath).resolve()
+    try:
+        full_path.relative_to(EDGE_DIR)
+    except ValueError:
+        return None
+    return full_path if full_path.suffix == '.jpg' else None
+
+
 @app.route('/image/<path:filepath>')
 def serve_image(filepath):
     """Serve Bild-Datei"""
     from flask import send_file
-    full_path = Path(__file__).parent / filepath
-    if full_path.exists() and full_path.suffix == '.jpg':
-        return send_file(full_path, mimetype='image/jpeg')
+    full_path = _resolve_image(filepath)
+    if full_path is not None and full_path.exists():
+        # Bilder ändern sich nicht: Browser-Cache + 304 über ETag/Last-Modified
+        return send_file(full_path, mimetype='image/jpeg', conditional=True, max_age=IMAGE_MAX_AGE,
+                         last_modified=full_path.stat().st_mtime)
     return "Not found", 404
 
 @app.route('/api/open_folder', methods=['POST'])
@@ -331,14 +729,12 @@ def open_folder():
 @app.route('/api/live/status')
 def live_status():
     """Get live inference status (from auto_live_system.py via live_state.json)"""
-    live_state_file = Path(__file__).parent / 'live_state.json'
     
     # Try to read live state from auto_live_system.py
-    if live_state_file.exists():
+    if LIVE_STATE_FILE.exists():
         try:
-            with open(live_state_file, 'r') as f:
-                state_data = json.load(f)
-                return jsonify(state_data)
+            state_data = load_json(LIVE_STATE_FILE)
+            return json_response(state_data)
         except Exception as e:
             print(f"Fehler beim Lesen von live_state.json: {e}")
     
@@ -375,7 +771,7 @@ def live_status():
             elif gps_last_position:
                 demo_state['current_position'] = [gps_last_position['latitude'], gps_last_position['longitude']]
     
-    return jsonify(demo_state)
+    return json_response(demo_state)
 
 
 @app.route('/live')
@@ -398,8 +794,10 @@ def live_start():
         if auto_process and auto_process.poll() is None:
             return jsonify({'error': 'already_running'}), 400
         try:
-            script = Path(__file__).parent / 'auto_live_system.py'
-            auto_process = subprocess.Popen(['python3', str(script)])
+            # GPS-Port freigeben, auto_live_system.py öffnet ihn selbst
+            with gps_lock:
+                release_gps()
+                auto_process = subprocess.Popen(['python3', str(LIVE_SCRIPT)])
             return jsonify({'status': 'started', 'pid': auto_process.pid})
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -423,10 +821,9 @@ def live_stop():
             auto_process = None
             
             # Clean up live_state.json after stopping
-            live_state_file = Path(__file__).parent / 'live_state.json'
-            if live_state_file.exists():
+            if LIVE_STATE_FILE.exists():
                 try:
-                    live_state_file.unlink()
+                    LIVE_STATE_FILE.unlink()
                     print("live_state.json gelöscht nach Stop")
                 except Exception as e:
                     print(f"Fehler beim Löschen von live_state.json: {e}")
@@ -448,77 +845,94 @@ def live_demo_toggle():
     return jsonify({'demo_mode': demo_mode})
 
 
-@app.route('/api/demo/gpx-route')
-def get_gpx_route():
-    """Load and parse GPX file for demo route"""
+def _iter_trkpts(path):
+    """Yield the trkpt elements of a GPX file, streamed (lxml filters by tag in C)"""
+    tag = f'{{{GPX_NS}}}trkpt'
+    
+    if lxml_etree is not None:
+        for _, elem in lxml_etree.iterparse(str(path), tag=tag):
+            yield elem
+            elem.clear()
+        return
+    
     import xml.etree.ElementTree as ET
+    for _, elem in ET.iterparse(path, events=('end',)):
+        if elem.tag == tag:
+            yield elem
+            elem.clear()
+
+
+def _parse_gpx(path):
+    """Track points of a GPX file as (lats, lons) float arrays"""
+    coords = np.fromiter((float(v) for elem in _iter_trkpts(path) for v in (elem.get('lat'), elem.get('lon'))),
+                         dtype=np.float64).reshape(-1, 2)
+    return coords[:, 0], coords[:, 1]
+
+
+def _build_demo_route():
+    """Demo route with surface segments and damages (deterministic)"""
     import random
     
-    gpx_file = os.path.join(os.path.dirname(__file__), 'demo_route', 'Tour14.gpx')
+    lats, lons = _parse_gpx(GPX_FILE)
     
-    try:
-        tree = ET.parse(gpx_file)
-        root = tree.getroot()
-        
-        # Extract namespace
-        ns = {'gpx': 'http://www.topografix.com/GPX/1/1'}
-        
-        # Extract all track points
-        route_points = []
-        
-        for trkpt in root.findall('.//gpx:trkpt', ns):
-            lat = float(trkpt.get('lat'))
-            lon = float(trkpt.get('lon'))
-            
-            route_points.append({
-                'latitude': lat,
-                'longitude': lon,
-                'surface_type': 'asphalt'  # Will be assigned in segments
+    # Assign surface types in realistic segments
+    # Most of route is asphalt, one section (~middle third) is unpaved/gravel
+    total_points = len(lats)
+    gravel_start = int(total_points * 0.4)  # Start gravel section at 40%
+    gravel_end = int(total_points * 0.6)    # End at 60% (Sirchenried-AIC15 section)
+    
+    surfaces = np.full(total_points, 'asphalt', dtype=object)  # Default asphalt
+    surfaces[gravel_start:gravel_end] = 'unpaved'               # Schotter/gravel section
+    
+    route_points = [{'latitude': lat, 'longitude': lon, 'surface_type': surface}
+                    for lat, lon, surface in zip(lats.tolist(), lons.tolist(), surfaces.tolist())]
+    
+    # Generate some demo damages along the route
+    rng = random.Random(DEMO_SEED)
+    damages = []
+    damage_types = ['pothole', 'crack_longitudinal', 'crack_transverse']
+    severities = ['high', 'medium', 'low']
+    image_paths = ['/damages/Schlagloch.jpg', '/damages/Risse.jpg', 
+                  '/damages/Risse1.jpg', '/damages/Schlagloch 2.jpg']
+    
+    # Place damages at specific intervals
+    num_damages = min(6, total_points // 100)  # ~6 damages
+    damage_indices = np.arange(1, num_damages + 1) * (total_points // (num_damages + 1))
+    
+    for idx in damage_indices.tolist():
+        if idx < total_points:
+            damages.append({
+                'latitude': route_points[idx]['latitude'],
+                'longitude': route_points[idx]['longitude'],
+                'damage_type': rng.choice(damage_types),
+                'severity': rng.choice(severities),
+                'confidence': round(rng.uniform(0.75, 0.95), 2),
+                'timestamp': '2025-10-27T12:00:00',
+                'image_path': rng.choice(image_paths)
             })
-        
-        # Assign surface types in realistic segments
-        # Most of route is asphalt, one section (~middle third) is unpaved/gravel
-        total_points = len(route_points)
-        gravel_start = int(total_points * 0.4)  # Start gravel section at 40%
-        gravel_end = int(total_points * 0.6)    # End at 60% (Sirchenried-AIC15 section)
-        
-        for i in range(len(route_points)):
-            if gravel_start <= i < gravel_end:
-                route_points[i]['surface_type'] = 'unpaved'  # Schotter/gravel section
-            else:
-                route_points[i]['surface_type'] = 'asphalt'  # Default asphalt
-        
-        # Generate some demo damages along the route
-        damages = []
-        damage_types = ['pothole', 'crack_longitudinal', 'crack_transverse']
-        severities = ['high', 'medium', 'low']
-        image_paths = ['/damages/Schlagloch.jpg', '/damages/Risse.jpg', 
-                      '/damages/Risse1.jpg', '/damages/Schlagloch 2.jpg']
-        
-        # Place damages at specific intervals
-        num_damages = min(6, len(route_points) // 100)  # ~6 damages
-        damage_indices = [i * (len(route_points) // (num_damages + 1)) for i in range(1, num_damages + 1)]
-        
-        for idx in damage_indices:
-            if idx < len(route_points):
-                point = route_points[idx]
-                damages.append({
-                    'latitude': point['latitude'],
-                    'longitude': point['longitude'],
-                    'damage_type': random.choice(damage_types),
-                    'severity': random.choice(severities),
-                    'confidence': round(random.uniform(0.75, 0.95), 2),
-                    'timestamp': '2025-10-27T12:00:00',
-                    'image_path': random.choice(image_paths)
-                })
-        
-        return jsonify({
-            'route_points': route_points,
-            'damages': damages,
-            'route_name': 'Rundwanderung Baindlkirch',
-            'total_points': len(route_points)
-        })
-        
+    
+    return {
+        'route_points': route_points,
+        'damages': damages,
+        'route_name': 'Rundwanderung Baindlkirch',
+        'total_points': len(route_points)
+    }
+
+
+def get_demo_route():
+    """Demo route, parsed on first use and cached"""
+    global _demo_route
+    with _demo_route_lock:
+        if _demo_route is None:
+            _demo_route = _build_demo_route()
+        return _demo_route
+
+
+@app.route('/api/demo/gpx-route')
+def get_gpx_route():
+    """Load and parse GPX file for demo route"""
+    try:
+        return json_response(get_demo_route())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -527,20 +941,12 @@ def get_gpx_route():
 def gps_current():
     """Get current GPS position from connected GPS module"""
     try:
-        # Try to import and read GPS (quick check only)
-        from gps_module import GPSModule
-        
-        gps_config = {
-            'port': '/dev/ttyACM0',
-            'baudrate': 9600,
-            'timeout': 1.0
-        }
+        gps = get_gps()
+        if gps is None:
+            raise RuntimeError('GPS-Modul nicht verfügbar')
         
-        gps = GPSModule(gps_config)
-        
-        # Quick read without waiting
+        # Letzter Fix aus dem Hintergrund-Reader - blockiert nicht
         position = gps.get_current_position()
-        gps.close()
         
         if position and position.get('latitude') is not None:
             return jsonify({
@@ -566,10 +972,53 @@ def gps_current():
         })
 
 
+def _probe_camera(force=False):
+    """Video devices and camera name, probed at most every HW_PROBE_TTL seconds"""
+    with _hw_probe_lock:
+        if not force and _hw_probe_cache['data'] is not None \
+                and time.monotonic() - _hw_probe_cache['t'] < HW_PROBE_TTL:
+            return _hw_probe_cache['data']
+        
+        info = {'available': False, 'busy': False}
+        try:
+            video_devices = sorted(glob.glob('/dev/video[0-9]*'),
+                                   key=lambda d: int(re.sub(r'\D', '', d) or 0))
+            
+            if video_devices:
+                info['available'] = True
+                info['device'] = video_devices[0]
+                
+                # Try to get camera name
+                try:
+                    result = subprocess.run(['v4l2-ctl', '--device', video_devices[0], '--info'], 
+                                          capture_output=True, text=True, timeout=2)
+                    if result.returncode == 0:
+                        for line in result.stdout.split('\n'):
+                            if 'Card type' in line:
+                                info['name'] = line.split(':')[1].strip()
+                                break
+                except:
+                    pass
+        except Exception as e:
+            print(f"Camera check error: {e}")
+            info['available'] = False
+        
+        _hw_probe_cache['t'] = time.monotonic()
+        _hw_probe_cache['data'] = info
+        return info
+
+
+@app.route('/api/hardware/refresh', methods=['POST'])
+def hardware_refresh():
+    """Probe camera devices again, then return the hardware status"""
+    _probe_camera(force=True)
+    return hardware_status()
+
+
 @app.route('/api/hardware/status')
 def hardware_status():
     """Get hardware status for GPS and Camera"""
-    global gps_module, gps_last_position
+    global gps_last_position
     
     status = {
         'gps': {
@@ -586,23 +1035,11 @@ def hardware_status():
     
     # Check GPS - use persistent GPS module to maintain satellite count cache
     try:
-        from gps_module import GPSModule
+        # Kein Reader (nicht verfügbar oder tty gehört gerade Aufnahme/Live) -> Cache unten
+        gps = get_gps()
         
-        # Initialize GPS module if not exists
-        if gps_module is None:
-            gps_config = {
-                'port': '/dev/ttyACM0',
-                'baudrate': 9600,
-                'timeout': 1.0
-            }
-            gps_module = GPSModule(gps_config)
-        
-        # Try to get position - may need multiple attempts to get fresh data
-        position = None
-        for attempt in range(3):
-            position = gps_module.get_current_position()
-            if position and position.get('latitude') is not None and position.get('latitude') != 0:
-                break
+        # Letzter Fix aus dem Hintergrund-Reader (veraltet erkennbar an der Satellitenzahl)
+        position = gps.get_current_position() if gps is not None else None
         
         if position and position.get('latitude') is not None and position.get('latitude') != 0:
             status['gps']['connected'] = True
@@ -661,39 +1098,8 @@ def hardware_status():
         status['camera']['busy'] = True
         status['camera']['device'] = '/dev/video0'
     else:
-        # Check for video devices and get info
-        try:
-            import os
-            import subprocess
-            
-            # Check which video devices exist
-            video_devices = []
-            for i in range(4):
-                device = f'/dev/video{i}'
-                if os.path.exists(device):
-                    video_devices.append(device)
-            
-            if video_devices:
-                status['camera']['available'] = True
-                status['camera']['busy'] = False
-                status['camera']['device'] = video_devices[0]
-                
-                # Try to get camera name
-                try:
-                    result = subprocess.run(['v4l2-ctl', '--device', video_devices[0], '--info'], 
-                                          capture_output=True, text=True, timeout=2)
-                    if result.returncode == 0:
-                        for line in result.stdout.split('\n'):
-                            if 'Card type' in line:
-                                status['camera']['name'] = line.split(':')[1].strip()
-                                break
-                except:
-                    pass
-            else:
-                status['camera']['available'] = False
-        except Exception as e:
-            print(f"Camera check error: {e}")
-            status['camera']['available'] = False
+        # Geräteliste und Name aus dem Probe-Cache - kein v4l2-ctl pro Aufruf
+        status['camera'].update(_probe_camera())
     
     return jsonify(status)
 
@@ -718,43 +1124,62 @@ def gps_last_known():
 # SAVED ROUTES API
 # ============================================
 
+def _read_session_summary(session_dir):
+    """Summary of a live session from its stats.json, None if unreadable"""
+    try:
+        stats = load_json(session_dir / "stats.json")
+        
+        # Extract summary info
+        route_summary = stats.get('route_summary', {})
+        return {
+            'session_id': stats.get('session_id', session_dir.name),
+            'route_name': stats.get('route_name', session_dir.name),
+            'created_at': stats.get('created_at', stats.get('start_time', '')),
+            'distance_km': route_summary.get('distance_km', 0),
+            'duration_minutes': route_summary.get('duration_minutes', 0),
+            'damage_count': route_summary.get('total_damages', 0),
+            'total_images': stats.get('total_images', 0)
+        }
+    except Exception as e:
+        print(f"Error loading session {session_dir.name}: {e}")
+        return None
+
+
 @app.route('/api/sessions/list')
 def sessions_list():
     """List all saved sessions/routes"""
     try:
-        base_dir = Path(__file__).parent / "live_sessions"
         
-        if not base_dir.exists():
+        if not SESSIONS_DIR.exists():
             return jsonify({'sessions': []})
         
+        # Unveränderte stats.json aus dem Cache, nur der Rest parallel lesen
         sessions = []
-        for session_dir in base_dir.iterdir():
+        pending = []
+        for session_dir in SESSIONS_DIR.iterdir():
             if session_dir.is_dir():
                 stats_file = session_dir / "stats.json"
-                if stats_file.exists():
-                    try:
-                        with open(stats_file, 'r') as f:
-                            stats = json.load(f)
-                        
-                        # Extract summary info
-                        route_summary = stats.get('route_summary', {})
-                        sessions.append({
-                            'session_id': stats.get('session_id', session_dir.name),
-                            'route_name': stats.get('route_name', session_dir.name),
-                            'created_at': stats.get('created_at', stats.get('start_time', '')),
-                            'distance_km': route_summary.get('distance_km', 0),
-                            'duration_minutes': route_summary.get('duration_minutes', 0),
-                            'damage_count': route_summary.get('total_damages', 0),
-                            'total_images': stats.get('total_images', 0)
-                        })
-                    except Exception as e:
-                        print(f"Error loading session {session_dir.name}: {e}")
-                        continue
+                mtime = _mtime_ns(stats_file)
+                if not mtime:
+                    continue
+                cached = _summary_cache.get(session_dir.name)
+                if cached and cached[0] == mtime:
+                    sessions.append(cached[1])
+                else:
+                    pending.append((session_dir, mtime))
+        
+        if pending:
+            with ThreadPoolExecutor(max_workers=SESSIONS_READ_WORKERS) as pool:
+                for (session_dir, mtime), summary in zip(pending, pool.map(_read_session_summary,
+                                                                           [d for d, _ in pending])):
+                    if summary is not None:
+                        _summary_cache[session_dir.name] = (mtime, summary)
+                        sessions.append(summary)
         
         # Sort by created_at descending (newest first)
         sessions.sort(key=lambda x: x['created_at'], reverse=True)
         
-        return jsonify({'sessions': sessions})
+        return json_response({'sessions': sessions})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -764,17 +1189,15 @@ def sessions_list():
 def session_detail(session_id):
     """Get detailed session data for display on map"""
     try:
-        base_dir = Path(__file__).parent / "live_sessions"
-        session_dir = base_dir / session_id
+        session_dir = SESSIONS_DIR / session_id
         stats_file = session_dir / "stats.json"
         
         if not stats_file.exists():
             return jsonify({'error': 'Session not found'}), 404
         
-        with open(stats_file, 'r') as f:
-            stats = json.load(f)
+        stats = load_json(stats_file)
         
-        return jsonify({
+        return json_response({
             'session_id': session_id,
             'route_name': stats.get('route_name', session_id),
             'created_at': stats.get('created_at', ''),
@@ -799,23 +1222,20 @@ def session_rename():
         if not session_id or not new_name:
             return jsonify({'success': False, 'message': 'Missing parameters'}), 400
         
-        base_dir = Path(__file__).parent / "live_sessions"
-        session_dir = base_dir / session_id
+        session_dir = SESSIONS_DIR / session_id
         stats_file = session_dir / "stats.json"
         
         if not stats_file.exists():
             return jsonify({'success': False, 'message': 'Session not found'}), 404
         
         # Load stats
-        with open(stats_file, 'r') as f:
-            stats = json.load(f)
+        stats = load_json(stats_file)
         
         # Update route name
         stats['route_name'] = new_name
         
         # Save back
-        with open(stats_file, 'w') as f:
-            json.dump(stats, f, indent=2)
+        write_json(stats_file, stats)
         
         return jsonify({'success': True})
     
@@ -835,8 +1255,7 @@ def session_delete():
         if not session_id:
             return jsonify({'success': False, 'message': 'Missing session_id'}), 400
         
-        base_dir = Path(__file__).parent / "live_sessions"
-        session_dir = base_dir / session_id
+        session_dir = SESSIONS_DIR / session_id
         
         if not session_dir.exists():
             return jsonify({'success': False, 'message': 'Session not found'}), 404
@@ -853,39 +1272,53 @@ def session_delete():
 # ============================================
 # STATIC FILES
 # ============================================
+# send_from_directory (Werkzeug, conditional=True) beantwortet bereits
+# Range-Requests mit 206 und If-None-Match/If-Modified-Since mit 304 -
+# deshalb hier kein eigenes Range-/ETag-Handling.
+
+def _send_asset(directory, filename):
+    """Send a file from one of the asset directories (nginx X-Accel-Redirect if enabled)"""
+    if SENDFILE_MODE != 'x-accel':
+        return send_from_directory(directory, filename)
+    
+    path = safe_join(str(directory), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    # Leerer Body - nginx liefert die Datei per sendfile(2) aus
+    response = Response(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+    response.headers['X-Accel-Redirect'] = f"{ACCEL_PREFIX}/{directory.name}/{quote(filename)}"
+    response.cache_control.public = True
+    response.cache_control.max_age = STATIC_MAX_AGE
+    return response
+
 
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     """Serve static files (demo images, etc.)"""
-    static_dir = Path(__file__).parent / 'static'
-    return send_from_directory(static_dir, filename)
+    return _send_asset(STATIC_DIR, filename)
 
 
 @app.route('/damages/<path:filename>')
 def serve_damage_image(filename):
     """Serve damage images from damages folder"""
-    damages_dir = Path(__file__).parent / 'damages'
-    return send_from_directory(damages_dir, filename)
+    return _send_asset(DAMAGES_DIR, filename)
 
 
 @app.route('/surfaces/<path:filename>')
 def serve_surface_image(filename):
     """Serve surface images from surfaces folder"""
-    surfaces_dir = Path(__file__).parent / 'surfaces'
-    return send_from_directory(surfaces_dir, filename)
+    return _send_asset(SURFACES_DIR, filename)
 
 
 @app.route('/routes/<path:filename>')
 def serve_route_image(filename):
     """Serve route images from routes folder"""
-    routes_dir = Path(__file__).parent / 'routes'
-    return send_from_directory(routes_dir, filename)
+    return _send_asset(ROUTES_DIR, filename)
 
 
 if __name__ == '__main__':
     # Erstelle templates-Verzeichnis
-    templates_dir = Path(__file__).parent / 'templates'
-    templates_dir.mkdir(exist_ok=True)
+    TEMPLATES_DIR.mkdir(exist_ok=True)
     
     print("="*60)
     print("🚴 Bike Surface AI - Web Interface")
@@ -895,4 +1328,14 @@ if __name__ == '__main__':
     print("\nZum Beenden: Strg+C")
     print("="*60)
     
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    get_preview()
+    
+    # Produktions-WSGI mit eigenem Thread-Pool: langlebige MJPEG-Streams
+    # blockieren das Status-Polling nicht
+    try:
+        from waitress import serve
+    except ImportError:
+        print("⚠️  waitress nicht installiert (pip install waitress) - nutze Flask-Server")
+        app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+    else:
+        serve(app, host='0.0.0.0', port=5000, threads=16, channel_timeout=3600)
@@ -0,0 +1,61 @@
+"""
+Shared config loader for the training scripts.
+Parses yolov8_config.yaml once and keeps a JSON copy next to it
+(yolov8_config.json, a build artifact) that is reused while it is newer
+than the YAML source. Also holds the mtime check used to skip
+exports/engine builds that are already up to date.
+"""
+
+import os
+import json
+import yaml
+from pathlib import Path
+
+# libyaml-backed C loader when available (pure-Python fallback)
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def load_config(config_path='yolov8_config.yaml'):
+    """Load configuration from YAML file (via the JSON cache when up to date)"""
+    config_path = Path(config_path)
+    cache_path = config_path.with_suffix('.json')
+
+    source_mtime = config_path.stat().st_mtime_ns
+    try:
+        if cache_path.stat().st_mtime_ns > source_mtime:
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    with open(config_path, 'r') as f:
+        config = yaml.load(f, Loader=_YAML_LOADER)
+
+    # Write the cache atomically; a read-only checkout simply skips it
+    tmp_path = cache_path.with_suffix('.json.tmp')
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(config, f)
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    return config
+
+
+def is_up_to_date(output_path, *source_paths):
+    """True if output_path exists and is newer than every existing source"""
+    try:
+        output_mtime = os.stat(output_path).st_mtime_ns
+    except OSError:
+        return False
+    for source in source_paths:
+        try:
+            if os.stat(source).st_mtime_ns >= output_mtime:
+                return False
+        except OSError:
+            continue
+    return True
@@ -4,18 +4,250 @@ Optimize model for deployment on Jetson Orin Nano.
 """
 
 import os
-import yaml
+import argparse
+import subprocess
+from collections import deque
 from pathlib import Path
 import logging
 
+from _config import load_config, is_up_to_date
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Options read from export.tensorrt (plus image_size from the training config)
+KNOWN_TRT_ARGS = {
+    'image_size', 'workspace_size', 'workspace_fraction', 'fp16', 'int8',
+    'optimization_level', 'sparsity', 'calib_dir', 'calib_images', 'calib_cache', 'debug'
+}
+
+# INT8 calibration: ~100 representative images are enough, more only slows the build
+CALIB_MAX_IMAGES = 100
+CALIB_CACHE = 'models/int8_calib.cache'
+CALIB_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def free_device_memory():
+    """Free GPU memory in bytes (pycuda, then torch), None if it cannot be queried"""
+    try:
+        import pycuda.driver as cuda
+        import pycuda.autoinit  # noqa: F401 - creates the CUDA context
+        return cuda.mem_get_info()[0]
+    except Exception:
+        pass
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return torch.cuda.mem_get_info()[0]
+    except Exception:
+        pass
+    return None
+
+
+def workspace_bytes(trt_args):
+    """
+    Workspace limit for the builder
+    
+    workspace_size (GB, float allowed) is the upper bound; where the free device
+    memory is known it is capped to workspace_fraction of it, so the 8 GB unified
+    memory of the Orin Nano is not overcommitted.
+    """
+    limit = int(float(trt_args.get('workspace_size', 4)) * (1 << 30))
+    free = free_device_memory()
+    if free:
+        limit = min(limit, int(free * trt_args.get('workspace_fraction', 0.75)))
+    return limit
+
+
+def preprocess_calibration_image(path, image_size):
+    """
+    Load an image the way YOLOv8 feeds it (letterbox, RGB, CHW, 0..1)
+    
+    Args:
+        path: Image file
+        image_size: Square network input size
+    
+    Returns:
+        float32 array of shape (3, image_size, image_size) or None
+    """
+    import cv2
+    import numpy as np
+    
+    img = cv2.imread(str(path))
+    if img is None:
+        return None
+    
+    h, w = img.shape[:2]
+    scale = min(image_size / h, image_size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    
+    canvas = np.full((image_size, image_size, 3), 114, dtype=np.uint8)
+    top = (image_size - new_h) // 2
+    left = (image_size - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+    
+    chw = canvas[:, :, ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(chw, dtype=np.float32) / 255.0
+
 
-def load_config(config_path='yolov8_config.yaml'):
-    """Load configuration from YAML file"""
-    with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
+def drop_stale_calib_cache(onnx_path, trt_args):
+    """
+    Remove the INT8 calibration cache if the ONNX model or calib_dir changed since
+    
+    The cache holds per-tensor scales of the network it was built for; reused for
+    a retrained model it silently produces a badly quantized engine.
+    """
+    cache_file = trt_args.get('calib_cache', CALIB_CACHE)
+    if not Path(cache_file).exists():
+        return
+    sources = [onnx_path]
+    if trt_args.get('calib_dir'):
+        sources.append(trt_args['calib_dir'])
+    if not is_up_to_date(cache_file, *sources):
+        logger.info(f"Calibration cache older than model/images, recalibrating: {cache_file}")
+        os.remove(cache_file)
+
+
+def create_int8_calibrator(trt, calib_dir, input_shape, cache_file=CALIB_CACHE,
+                           max_images=CALIB_MAX_IMAGES):
+    """
+    Create an IInt8EntropyCalibrator2 fed from a directory of images
+    
+    Args:
+        trt: Imported tensorrt module
+        calib_dir: Directory with calibration images (may be None if a cache exists)
+        input_shape: Network input shape (N, C, H, W)
+        cache_file: Calibration table cache, reused on later builds
+        max_images: Maximum number of images to calibrate with
+    
+    Returns:
+        Calibrator instance or None if neither images nor a cache are available
+        (or pycuda is missing)
+    """
+    import numpy as np
+    try:
+        import pycuda.driver as cuda
+        import pycuda.autoinit  # noqa: F401 - creates the CUDA context
+    except ImportError:
+        # Reported here, not as "TensorRT not available" - TensorRT itself is installed
+        logger.error("pycuda not installed - INT8 calibration needs it (pip install pycuda)")
+        return None
+    
+    batch_size, _, image_size, _ = input_shape
+    
+    images = []
+    if calib_dir and Path(calib_dir).is_dir():
+        images = sorted(p for p in Path(calib_dir).rglob('*')
+                        if p.suffix.lower() in CALIB_EXTENSIONS)[:max_images]
+    
+    if not images and not Path(cache_file).exists():
+        return None
+    
+    class EntropyCalibrator(trt.IInt8EntropyCalibrator2):
+        """Streams preprocessed calibration batches to the device"""
+        
+        def __init__(self):
+            super().__init__()
+            self.index = 0
+            self.batch = np.zeros(input_shape, dtype=np.float32)
+            self.device_input = cuda.mem_alloc(self.batch.nbytes)
+        
+        def get_batch_size(self):
+            return batch_size
+        
+        def get_batch(self, names):
+            if self.index + batch_size > len(images):
+                return None
+            
+            for i in range(batch_size):
+                data = preprocess_calibration_image(images[self.index + i], image_size)
+                if data is None:
+                    logger.warning(f"Unreadable calibration image: {images[self.index + i]}")
+                    data = 0.0
+                self.batch[i] = data
+            self.index += batch_size
+            
+            if self.index % (10 * batch_size) == 0:
+                logger.info(f"Calibration batch {self.index}/{len(images)}")
+            
+            cuda.memcpy_htod(self.device_input, self.batch)
+            return [int(self.device_input)]
+        
+        def read_calibration_cache(self):
+            if Path(cache_file).exists():
+                logger.info(f"Using calibration cache: {cache_file}")
+                with open(cache_file, 'rb') as f:
+                    return f.read()
+            return None
+        
+        def write_calibration_cache(self, cache):
+            os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+            with open(cache_file, 'wb') as f:
+                f.write(cache)
+            logger.info(f"Calibration cache saved to: {cache_file}")
+    
+    logger.info(f"INT8 calibration images: {len(images)}")
+    return EntropyCalibrator()
+
+
+def create_progress_monitor(trt):
+    """
+    Create an IProgressMonitor that logs builder phases
+    
+    Args:
+        trt: Imported tensorrt module
+    
+    Returns:
+        Progress monitor instance
+    """
+    class LogProgressMonitor(trt.IProgressMonitor):
+        """Logs phase start/finish and every ~10% of the steps of a phase"""
+        
+        def __init__(self):
+            trt.IProgressMonitor.__init__(self)
+            self.steps = {}
+        
+        def phase_start(self, phase_name, parent_phase, num_steps):
+            self.steps[phase_name] = num_steps
+            logger.info(f"[build] {phase_name} ({num_steps} steps)")
+        
+        def step_complete(self, phase_name, step):
+            num_steps = self.steps.get(phase_name, 0)
+            if num_steps >= 10 and (step + 1) % (num_steps // 10) == 0:
+                logger.info(f"[build] {phase_name}: {step + 1}/{num_steps}")
+            return True  # False would cancel the build
+        
+        def phase_finish(self, phase_name):
+            self.steps.pop(phase_name, None)
+            logger.info(f"[build] {phase_name} done")
+    
+    return LogProgressMonitor()
+
+
+def write_engine(output_path, serialized_engine):
+    """
+    Write the serialized engine atomically without an intermediate bytes copy
+    
+    The data goes to <engine>.tmp and is renamed after fsync, so an interrupted
+    write never leaves a truncated engine that looks up to date. The page-cache
+    hint keeps the (one-shot) engine data from filling the Jetson's unified memory.
+    """
+    tmp_path = f"{output_path}.tmp"
+    data = memoryview(serialized_engine).cast('B')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+        os.fsync(fd)
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except BaseException:
+        os.close(fd)
+        os.remove(tmp_path)
+        raise
+    os.close(fd)
+    os.replace(tmp_path, output_path)
 
 
 def convert_to_tensorrt(onnx_path, output_path, **trt_args):
@@ -65,7 +297,7 @@ def convert_to_tensorrt(onnx_path, output_path, **trt_args):
         config = builder.create_builder_config()
         
         # Set workspace size
-        workspace_size = trt_args.get('workspace_size', 4) * (1 << 30)  # GB to bytes
+        workspace_size = workspace_bytes(trt_args)
         config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, workspace_size)
         logger.info(f"Workspace size: {workspace_size / (1<<30):.1f} GB")
         
@@ -74,11 +306,60 @@ def convert_to_tensorrt(onnx_path, output_path, **trt_args):
             config.set_flag(trt.BuilderFlag.FP16)
             logger.info("✓ FP16 mode enabled")
         
+        # More tactic search at build time (TensorRT >= 8.6; 3 = TensorRT default)
+        optimization_level = trt_args.get('optimization_level', 3)
+        if hasattr(config, 'builder_optimization_level'):
+            config.builder_optimization_level = optimization_level
+            logger.info(f"Builder optimization level: {optimization_level}")
+        
+        # Structured (2:4) sparsity in the weights
+        if trt_args.get('sparsity', False):
+            config.set_flag(trt.BuilderFlag.SPARSE_WEIGHTS)
+            logger.info("✓ Sparse weights enabled")
+        
+        # Explicit batch: fixed-size profile for dynamic inputs (also used for calibration)
+        input_tensor = network.get_input(0)
+        image_size = trt_args.get('image_size', 640)
+        input_shape = tuple(input_tensor.shape)
+        profile = None
+        if any(dim < 0 for dim in input_shape):
+            input_shape = (1, 3, image_size, image_size)
+            profile = builder.create_optimization_profile()
+            profile.set_shape(input_tensor.name, input_shape, input_shape, input_shape)
+            config.add_optimization_profile(profile)
+            logger.info(f"Optimization profile: {input_tensor.name} {input_shape}")
+        
         # Enable INT8 precision if requested
         if trt_args.get('int8', False) and builder.platform_has_fast_int8:
             config.set_flag(trt.BuilderFlag.INT8)
             logger.info("✓ INT8 mode enabled")
-            logger.warning("INT8 calibration required for optimal results")
+            
+            if not trt_args.get('qdq', False):
+                drop_stale_calib_cache(onnx_path, trt_args)
+            
+            # QDQ models carry their own INT8 scales - no calibrator needed
+            calibrator = None if trt_args.get('qdq', False) else create_int8_calibrator(
+                trt,
+                trt_args.get('calib_dir'),
+                input_shape,
+                cache_file=trt_args.get('calib_cache', CALIB_CACHE),
+                max_images=trt_args.get('calib_images', CALIB_MAX_IMAGES)
+            )
+            if trt_args.get('qdq', False):
+                logger.info("✓ Explicit INT8 (QDQ) model - calibration skipped")
+            elif calibrator is None:
+                # Without scales TensorRT would build an INT8 engine with wrong ranges
+                logger.error("INT8 build needs a calibrator: set export.tensorrt.calib_dir "
+                             "and install pycuda, or disable int8")
+                return None
+            else:
+                config.int8_calibrator = calibrator
+                if profile is not None:
+                    config.set_calibration_profile(profile)
+        
+        # Report build progress (TensorRT >= 10), long INT8 builds otherwise look hung
+        if hasattr(trt, 'IProgressMonitor'):
+            config.progress_monitor = create_progress_monitor(trt)
         
         # Build engine
         logger.info("\nBuilding TensorRT engine...")
@@ -92,8 +373,7 @@ def convert_to_tensorrt(onnx_path, output_path, **trt_args):
         
         # Save engine
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'wb') as f:
-            f.write(serialized_engine)
+        write_engine(output_path, serialized_engine)
         
         logger.info(f"\n✓ TensorRT engine saved to: {output_path}")
         
@@ -132,60 +412,100 @@ def convert_using_trtexec(onnx_path, output_path, **trt_args):
     logger.info("Converting using trtexec (command-line tool)")
     logger.info("=" * 60)
     
-    # Build trtexec command
+    # Build trtexec command (engine goes to a temp file, renamed only on success)
+    tmp_path = f"{output_path}.tmp"
     cmd = [
         "trtexec",
         f"--onnx={onnx_path}",
-        f"--saveEngine={output_path}",
+        f"--saveEngine={tmp_path}",
     ]
     
-    # Add workspace size
-    workspace_mb = trt_args.get('workspace_size', 4) * 1024
-    cmd.append(f"--workspace={workspace_mb}")
+    # Add workspace size (--workspace is deprecated)
+    workspace_mb = workspace_bytes(trt_args) >> 20
+    cmd.append(f"--memPoolSize=workspace:{workspace_mb}M")
     
     # Add FP16
     if trt_args.get('fp16', True):
         cmd.append("--fp16")
     
-    # Add INT8
+    # Add INT8 (with the calibration table written by the Python API, if present)
     if trt_args.get('int8', False):
         cmd.append("--int8")
+        calib_cache = trt_args.get('calib_cache', CALIB_CACHE)
+        drop_stale_calib_cache(onnx_path, trt_args)
+        if Path(calib_cache).exists():
+            cmd.append(f"--calib={calib_cache}")
+        elif not trt_args.get('qdq', False):
+            # trtexec cannot calibrate from images - INT8 without a table has wrong scales
+            logger.error(f"No INT8 calibration cache ({calib_cache}) - run the Python API build "
+                         "with calib_dir and pycuda first, or disable int8")
+            return None
     
-    # Add verbosity
-    cmd.append("--verbose")
+    # Builder optimization level / sparsity - only when different from the TensorRT
+    # default 3, trtexec before 8.6 (JetPack 5) rejects --builderOptimizationLevel
+    optimization_level = trt_args.get('optimization_level', 3)
+    if optimization_level != 3:
+        cmd.append(f"--builderOptimizationLevel={optimization_level}")
+    if trt_args.get('sparsity', False):
+        cmd.append("--sparsity=enable")
+    
+    # Add verbosity (tactic failures only show up in the verbose log)
+    if trt_args.get('debug', False):
+        cmd.append("--verbose")
     
     cmd_str = " ".join(cmd)
     logger.info(f"\nCommand: {cmd_str}")
     logger.info("\nExecuting trtexec...")
     logger.info("This may take several minutes...\n")
     
-    import subprocess
     try:
-        result = subprocess.run(
+        # Stream the log line by line instead of buffering it in memory
+        tail = deque(maxlen=20)
+        with subprocess.Popen(
             cmd,
-            check=True,
-            capture_output=True,
-            text=True
-        )
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        ) as proc:
+            for line in proc.stdout:
+                line = line.rstrip()
+                tail.append(line)
+                logger.info(line)
+        
+        if proc.returncode != 0 or not os.path.exists(tmp_path):
+            logger.error(f"trtexec failed with return code {proc.returncode}")
+            logger.error("\n".join(tail))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        
+        os.replace(tmp_path, output_path)
         
-        logger.info(result.stdout)
         logger.info(f"\n✓ Conversion successful!")
         logger.info(f"Engine saved to: {output_path}")
         
         return output_path
     
-    except subprocess.CalledProcessError as e:
-        logger.error(f"trtexec failed with return code {e.returncode}")
-        logger.error(e.stderr)
-        return None
     except FileNotFoundError:
         logger.error("trtexec not found!")
         logger.info("trtexec is included with TensorRT and JetPack")
         return None
 
 
+def validate_trt_args(trt_args):
+    """Warn about unknown export.tensorrt keys (typos silently fall back to defaults)"""
+    for key in sorted(set(trt_args) - KNOWN_TRT_ARGS):
+        logger.warning(f"Unknown export.tensorrt option ignored: {key}")
+
+
 def main():
     """Main conversion pipeline"""
+    parser = argparse.ArgumentParser(description='Convert ONNX model to TensorRT engine')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild the engine even if it is newer than the ONNX model and config')
+    args = parser.parse_args()
+    
     # Load configuration
     try:
         config = load_config('yolov8_config.yaml')
@@ -204,8 +524,25 @@ def main():
     # Output path for TensorRT engine
     trt_path = Path('models') / 'surface_detection.engine'
     
-    # Get TensorRT configuration
-    trt_config = config.get('export', {}).get('tensorrt', {})
+    # Get TensorRT configuration (input size for calibration/profiles from training config)
+    trt_config = {'image_size': config.get('image_size', 640),
+                  **config.get('export', {}).get('tensorrt', {})}
+    
+    validate_trt_args(trt_config)
+    
+    # Prefer the QDQ model from export_onnx.py (quantize: int8) for INT8 builds,
+    # but only if it was quantized from the current base ONNX
+    base_onnx = onnx_path
+    qdq_path = onnx_path.with_name(onnx_path.stem + '_qdq.onnx')
+    if trt_config.get('int8', False) and is_up_to_date(qdq_path, onnx_path):
+        onnx_path = qdq_path
+        trt_config['qdq'] = True
+    
+    # Engine builds take minutes to hours - skip if nothing changed
+    # (the base ONNX counts too when building from the QDQ model)
+    if not args.force and is_up_to_date(trt_path, onnx_path, base_onnx, 'yolov8_config.yaml'):
+        logger.info(f"Engine up-to-date, skipping build: {trt_path} (use --force to rebuild)")
+        return
     
     logger.info(f"ONNX model: {onnx_path}")
     logger.info(f"Output engine: {trt_path}")
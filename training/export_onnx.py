@@ -4,21 +4,18 @@ Convert trained PyTorch model to ONNX for deployment.
 """
 
 import os
-import yaml
+import time
+import argparse
 from pathlib import Path
 from ultralytics import YOLO
 import logging
 
+from _config import load_config, is_up_to_date
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def load_config(config_path='yolov8_config.yaml'):
-    """Load configuration from YAML file"""
-    with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
-
-
 def export_to_onnx(model_path, output_dir='models', **export_args):
     """
     Export YOLOv8 model to ONNX format
@@ -66,12 +63,81 @@ def export_to_onnx(model_path, output_dir='models', **export_args):
         raise
 
 
-def validate_onnx_model(onnx_path):
+def quantize_onnx_int8(onnx_path, calib_dir, image_size=640, max_images=100):
+    """
+    Insert QuantizeLinear/DequantizeLinear nodes (explicit INT8) with NVIDIA ModelOpt
+    
+    TensorRT then picks real INT8 kernels from the QDQ scales and needs no
+    runtime calibrator.
+    
+    Args:
+        onnx_path: Exported FP32 ONNX model
+        calib_dir: Directory with calibration images
+        image_size: Square network input size
+        max_images: Maximum number of calibration images
+    
+    Returns:
+        Path to the QDQ model or None
+    """
+    logger.info("\nQuantizing ONNX model (INT8 QDQ)...")
+    
+    try:
+        import numpy as np
+        from modelopt.onnx.quantization import quantize
+        from convert_tensorrt import preprocess_calibration_image, CALIB_EXTENSIONS
+    except ImportError:
+        logger.warning("nvidia-modelopt not installed. Skipping INT8 quantization.")
+        logger.info("Install with: pip install nvidia-modelopt[onnx]")
+        return None
+    
+    images = []
+    if calib_dir and Path(calib_dir).is_dir():
+        images = sorted(p for p in Path(calib_dir).rglob('*')
+                        if p.suffix.lower() in CALIB_EXTENSIONS)[:max_images]
+    batches = [b for b in (preprocess_calibration_image(p, image_size) for p in images) if b is not None]
+    if not batches:
+        logger.warning(f"No calibration images found in {calib_dir} - skipping INT8 quantization")
+        return None
+    
+    # Quantize into a temp file; the QDQ model only appears once it is complete
+    output_path = str(Path(onnx_path).with_name(Path(onnx_path).stem + '_qdq.onnx'))
+    tmp_path = str(Path(onnx_path).with_name(Path(onnx_path).stem + '_qdq.tmp.onnx'))
+    try:
+        quantize(
+            onnx_path=str(onnx_path),
+            quantize_mode='int8',
+            calibration_data=np.stack(batches),
+            output_path=tmp_path
+        )
+        os.replace(tmp_path, output_path)
+    except Exception as e:
+        logger.error(f"INT8 quantization failed: {e}", exc_info=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    
+    logger.info(f"✓ QDQ model saved to: {output_path} ({len(batches)} calibration images)")
+    return output_path
+
+
+def remove_qdq_model(onnx_path):
+    """Delete the QDQ model belonging to onnx_path, if any"""
+    qdq_path = Path(onnx_path).with_name(Path(onnx_path).stem + '_qdq.onnx')
+    if qdq_path.exists():
+        logger.info(f"Removing stale QDQ model: {qdq_path}")
+        qdq_path.unlink()
+
+
+def validate_onnx_model(onnx_path, strict=False):
     """
     Validate exported ONNX model
     
     Args:
         onnx_path: Path to ONNX model
+        strict: Run onnx.checker (pure overhead for well-formed ultralytics exports)
+    
+    Returns:
+        Loaded onnx.ModelProto (reused for the inference test) or None
     """
     logger.info("\nValidating ONNX model...")
     
@@ -82,9 +148,11 @@ def validate_onnx_model(onnx_path):
         onnx_model = onnx.load(onnx_path)
         
         # Check model
-        onnx.checker.check_model(onnx_model)
-        
-        logger.info("✓ ONNX model is valid")
+        if strict:
+            onnx.checker.check_model(onnx_model)
+            logger.info("✓ ONNX model is valid")
+        else:
+            logger.info("✓ ONNX model loaded (checker skipped, set export.onnx.strict_check)")
         
         # Print model info
         logger.info("\nModel Information:")
@@ -104,24 +172,66 @@ def validate_onnx_model(onnx_path):
             logger.info(f"  Name: {output_tensor.name}")
             logger.info(f"  Shape: {[d.dim_value for d in output_tensor.type.tensor_type.shape.dim]}")
         
-        return True
+        return onnx_model
     
     except ImportError:
         logger.warning("ONNX package not installed. Skipping validation.")
         logger.info("Install with: pip install onnx")
-        return False
+        return None
     except Exception as e:
         logger.error(f"Validation failed: {e}")
-        return False
+        return None
+
+
+# Compiled TensorRT engines of the ORT TensorRT provider (avoids rebuilding on every start)
+ORT_TRT_CACHE = 'models/trt_cache'
+
+
+def create_inference_session(model_source, trt_cache=ORT_TRT_CACHE):
+    """
+    Create an ONNX Runtime session tuned for throughput
+    
+    Args:
+        model_source: Path to ONNX model or serialized model bytes
+        trt_cache: Engine cache directory for the TensorRT provider
+    
+    Returns:
+        onnxruntime.InferenceSession
+    """
+    import onnxruntime as ort
+    
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+    
+    providers = [
+        ('TensorrtExecutionProvider', {
+            'trt_fp16_enable': True,
+            'trt_engine_cache_enable': True,
+            'trt_engine_cache_path': trt_cache
+        }),
+        'CUDAExecutionProvider',
+        'CPUExecutionProvider'
+    ]
+    # Only request providers this onnxruntime build has (no fallback warnings)
+    available = set(ort.get_available_providers())
+    providers = [p for p in providers if (p[0] if isinstance(p, tuple) else p) in available]
+    if any(isinstance(p, tuple) for p in providers):
+        os.makedirs(trt_cache, exist_ok=True)
+    
+    return ort.InferenceSession(model_source, sess_options=options, providers=providers)
 
 
-def test_onnx_inference(onnx_path, test_image=None):
+def test_onnx_inference(onnx_path, test_image=None, onnx_model=None, warmup=3, runs=20):
     """
-    Test ONNX model inference
+    Test ONNX model inference and measure warm latency
     
     Args:
         onnx_path: Path to ONNX model
         test_image: Optional test image path
+        onnx_model: Already loaded onnx.ModelProto (avoids reading the file again)
+        warmup: Untimed runs first (TensorRT engine build, CUDA init)
+        runs: Timed runs for mean/p50/p95
     """
     logger.info("\nTesting ONNX inference...")
     
@@ -129,11 +239,9 @@ def test_onnx_inference(onnx_path, test_image=None):
         import onnxruntime as ort
         import numpy as np
         
-        # Create inference session
-        session = ort.InferenceSession(
-            onnx_path,
-            providers=['CUDAExecutionProvider', 'CPUExecutionProvider']
-        )
+        # Create inference session (from the in-memory model if available)
+        model_source = onnx_model.SerializeToString() if onnx_model is not None else onnx_path
+        session = create_inference_session(model_source)
         
         logger.info(f"✓ ONNX Runtime session created")
         logger.info(f"  Providers: {session.get_providers()}")
@@ -144,12 +252,45 @@ def test_onnx_inference(onnx_path, test_image=None):
         logger.info(f"  Input name: {input_name}")
         logger.info(f"  Input shape: {input_shape}")
         
-        # Run dummy inference
-        dummy_input = np.random.rand(*input_shape).astype(np.float32)
-        outputs = session.run(None, {input_name: dummy_input})
+        # Run dummy inference with the model's own input dtype (no float64 intermediate)
+        input_type = session.get_inputs()[0].type
+        shape = [d if isinstance(d, int) else 1 for d in input_shape]
+        rng = np.random.default_rng()
+        if input_type == 'tensor(float16)':
+            dummy_input = rng.random(shape, dtype=np.float32).astype(np.float16)
+        elif input_type == 'tensor(int8)':
+            dummy_input = rng.integers(-128, 128, size=shape, dtype=np.int8)
+        else:
+            dummy_input = rng.random(shape, dtype=np.float32)
+        logger.info(f"  Input type: {input_type}")
+        
+        # Input and outputs bound once on the device: no per-run host<->device copies
+        device = 'cuda' if set(session.get_providers()) & {'TensorrtExecutionProvider',
+                                                             'CUDAExecutionProvider'} else 'cpu'
+        binding = session.io_binding()
+        binding.bind_ortvalue_input(input_name, ort.OrtValue.ortvalue_from_numpy(dummy_input, device, 0))
+        for output in session.get_outputs():
+            binding.bind_output(output.name, device)
+        
+        for _ in range(warmup):
+            session.run_with_iobinding(binding)
+        binding.synchronize_outputs()
+        
+        timings = np.empty(runs, dtype=np.float64)
+        for i in range(runs):
+            start = time.perf_counter_ns()
+            session.run_with_iobinding(binding)
+            binding.synchronize_outputs()
+            timings[i] = (time.perf_counter_ns() - start) / 1e6
+        
+        outputs = binding.copy_outputs_to_cpu()
         
         logger.info(f"✓ Inference successful")
         logger.info(f"  Output shapes: {[out.shape for out in outputs]}")
+        if runs:
+            p50, p95 = np.percentile(timings, [50, 95])
+            logger.info(f"  Latency ({runs} runs after {warmup} warmup): "
+                        f"mean {timings.mean():.2f} ms | p50 {p50:.2f} ms | p95 {p95:.2f} ms")
         
         return True
     
@@ -164,6 +305,11 @@ def test_onnx_inference(onnx_path, test_image=None):
 
 def main():
     """Main export pipeline"""
+    parser = argparse.ArgumentParser(description='Export YOLOv8 model to ONNX')
+    parser.add_argument('--force', action='store_true',
+                        help='Export even if the ONNX model is newer than the .pt and config')
+    args = parser.parse_args()
+    
     # Load configuration
     try:
         config = load_config('yolov8_config.yaml')
@@ -186,19 +332,56 @@ def main():
     # Get export configuration
     export_config = config.get('export', {}).get('onnx', {})
     
-    # Export to ONNX
-    onnx_path = export_to_onnx(
-        str(model_path),
-        output_dir='models',
-        opset=export_config.get('opset_version', 12),
-        simplify=export_config.get('simplify', True),
-        dynamic=export_config.get('dynamic', False)
-    )
+    # Export to ONNX (ultralytics writes it in place next to the .pt) - skip if up to date.
+    # The .complete stamp is only written after a finished export, so a partial
+    # .onnx from an interrupted run never counts as up to date.
+    existing_onnx = model_path.with_suffix('.onnx')
+    export_stamp = existing_onnx.with_suffix('.onnx.complete')
+    # The stamp is touched right after the export and may share the ONNX mtime
+    # on coarse-timestamp filesystems, hence <= for the ONNX itself.
+    if (not args.force and existing_onnx.exists()
+            and is_up_to_date(export_stamp, model_path, 'yolov8_config.yaml')
+            and existing_onnx.stat().st_mtime_ns <= export_stamp.stat().st_mtime_ns):
+        logger.info(f"ONNX model up-to-date, skipping export: {existing_onnx} (use --force to re-export)")
+        onnx_path = str(existing_onnx)
+    else:
+        if export_stamp.exists():
+            export_stamp.unlink()
+        # A QDQ model of the previous weights must not outlive the re-export
+        remove_qdq_model(existing_onnx)
+        onnx_path = export_to_onnx(
+            str(model_path),
+            output_dir='models',
+            opset=export_config.get('opset_version', 17),
+            simplify=export_config.get('simplify', True),
+            dynamic=export_config.get('dynamic', False)
+        )
+        if onnx_path and Path(onnx_path).resolve() == existing_onnx.resolve():
+            export_stamp.touch()
     
     # Validate ONNX model
     if onnx_path:
-        validate_onnx_model(onnx_path)
-        test_onnx_inference(onnx_path)
+        onnx_model = validate_onnx_model(onnx_path, strict=export_config.get('strict_check', False))
+        test_onnx_inference(onnx_path, onnx_model=onnx_model)
+        
+        # Optional explicit INT8 (QDQ) model for TensorRT
+        if export_config.get('quantize') == 'int8':
+            trt_config = config.get('export', {}).get('tensorrt', {})
+            qdq_path = Path(onnx_path).with_name(Path(onnx_path).stem + '_qdq.onnx')
+            calib_dir = trt_config.get('calib_dir')
+            if not args.force and is_up_to_date(qdq_path, onnx_path, 'yolov8_config.yaml',
+                                                 *([calib_dir] if calib_dir else [])):
+                logger.info(f"QDQ model up-to-date, skipping quantization: {qdq_path}")
+            elif quantize_onnx_int8(
+                onnx_path,
+                calib_dir,
+                image_size=config.get('image_size', 640),
+                max_images=trt_config.get('calib_images', 100)
+            ) is None:
+                # convert_tensorrt.py would otherwise pick up an old QDQ model
+                remove_qdq_model(onnx_path)
+        else:
+            remove_qdq_model(onnx_path)
     
     logger.info("\n" + "=" * 60)
     logger.info("Export completed!")
@@ -4,21 +4,28 @@ Train a custom YOLOv8 model for detecting road surfaces and damages.
 """
 
 import os
+import shutil
 import yaml
 from pathlib import Path
 import torch
 from ultralytics import YOLO
 import logging
 
+from _config import load_config
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# libyaml-backed C dumper when available (pure-Python fallback)
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+# Free RAM needed before the dataset is cached in memory instead of on disk
+RAM_CACHE_MIN_BYTES = 32 * (1 << 30)
+
 
 def load_training_config(config_path='yolov8_config.yaml'):
-    """Load training configuration from YAML file"""
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-    return config
+    """Load training configuration from YAML file (cached as JSON, see _config.py)"""
+    return load_config(config_path)
 
 
 def setup_directories():
@@ -29,6 +36,33 @@ def setup_directories():
     logger.info("Directories created")
 
 
+def publish_model(src, dst):
+    """
+    Copy src to dst atomically (tmp file + os.replace)
+
+    A hardlink would share the inode with runs/.../best.pt, which the next
+    run (exist_ok=True reuses the run dir) rewrites in place.
+    """
+    dst = Path(dst)
+    tmp = dst.with_name(dst.name + '.tmp')
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except OSError:
+        if tmp.exists():
+            tmp.unlink()
+        raise
+
+
+def default_cache_mode():
+    """Cache images in RAM on machines with plenty of free memory, else on disk"""
+    try:
+        import psutil
+    except ImportError:
+        return 'disk'
+    return 'ram' if psutil.virtual_memory().available > RAM_CACHE_MIN_BYTES else 'disk'
+
+
 def train_surface_detection_model(config):
     """
     Train YOLOv8 model for surface and damage detection
@@ -59,7 +93,7 @@ def train_surface_detection_model(config):
         'imgsz': config['image_size'],
         'batch': config['batch_size'],
         'device': device,
-        'workers': config['workers'],
+        'workers': config.get('workers') or min(8, os.cpu_count() or 1),
         'project': 'runs/detect',
         'name': config.get('experiment_name', 'bike_surface_v1'),
         'exist_ok': True,
@@ -69,7 +103,10 @@ def train_surface_detection_model(config):
         'patience': config.get('patience', 50),
         'save': True,
         'save_period': config.get('save_period', 10),
-        'cache': False,
+        'cache': config.get('cache', default_cache_mode()),
+        'amp': config.get('amp', True),  # mixed precision on Tensor Cores
+        'half': False,  # FP16 inference only, not for training
+        'close_mosaic': config.get('close_mosaic', 10),
         'verbose': True,
         'seed': config.get('seed', 0),
         'deterministic': True,
@@ -118,9 +155,8 @@ def train_surface_detection_model(config):
         best_model_path = Path('runs/detect') / train_args['name'] / 'weights' / 'best.pt'
         if best_model_path.exists():
             # Copy to models directory
-            import shutil
             output_path = Path('models') / f"surface_detection_best.pt"
-            shutil.copy(best_model_path, output_path)
+            publish_model(best_model_path, output_path)
             logger.info(f"\nBest model saved to: {output_path}")
         
         return results
@@ -177,7 +213,7 @@ def create_sample_dataset_config():
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
     with open(output_path, 'w') as f:
-        yaml.dump(sample_config, f, default_flow_style=False)
+        yaml.dump(sample_config, f, Dumper=_YAML_DUMPER, default_flow_style=False)
     
     logger.info(f"Sample dataset config created: {output_path}")
     logger.info("NOTE: Update this file with your actual dataset paths!")